@@ -1,12 +1,13 @@
 from flask import Flask
 
 from app.api.v1 import register_api_blueprints
+from app.commands import register_commands
 from app.views import register_views
 from app.dummy_db import _populate_db
 from app.reader.s3 import S3Reader
 from app.reader.test import TestReader
 from app.utils import datetimeformat, file_type
-from app.extensions import db, bootstrap, pages, parser, ma, restapi, migrate
+from app.extensions import db, bootstrap, pages, parser, ma, restapi, migrate, jobs, thumbnails, tiles
 
 
 def create_app(mode):
@@ -18,14 +19,25 @@ def create_app(mode):
 
     app = Flask(__name__, instance_relative_config=False)
 
-    reader = S3Reader()
     if mode == "dev":
         app.config.from_object("app.config.dev")
     elif mode == "prod":
         app.config.from_object("app.config.prod")
     else:
         app.config.from_object("app.config.test")
+
+    if mode == "test":
         reader = TestReader()
+    else:
+        reader = S3Reader(
+            list_workers=app.config["S3_LIST_WORKERS"],
+            read_workers=app.config["S3_READ_WORKERS"],
+            decode_workers=app.config["S3_DECODE_WORKERS"],
+            max_pool_connections=app.config["S3_MAX_POOL_CONNECTIONS"],
+            max_attempts=app.config["S3_MAX_ATTEMPTS"],
+            retry_mode=app.config["S3_RETRY_MODE"],
+            tcp_keepalive=app.config["S3_TCP_KEEPALIVE"],
+        )
 
     # set jinja filters
     app.jinja_env.filters["datetimeformat"] = datetimeformat
@@ -39,12 +51,17 @@ def create_app(mode):
     pages.init_app(app)
     parser.init_app(app, reader)
     ma.init_app(app)
+    jobs.init_app(app)
+    thumbnails.init_app(app, reader)
+    tiles.init_app(app, reader)
 
-    register_views(app, reader)
+    register_views(app, thumbnails)
 
     restapi.init_app(app)
     register_api_blueprints(restapi)
 
+    register_commands(app)
+
     if mode == "test":
         with app.app_context():
             db.drop_all()
@@ -11,6 +11,7 @@ def register_api_blueprints(restapi):
     from .modality import blp as modality_blp
     from .tag import blp as tag_blp
     from .compound_props import blp as prop_blp
+    from .job import blp as job_blp
 
     restapi.register_blueprint(plate_blp)
     restapi.register_blueprint(section_blp)
@@ -22,3 +23,4 @@ def register_api_blueprints(restapi):
     restapi.register_blueprint(modality_blp)
     restapi.register_blueprint(tag_blp)
     restapi.register_blueprint(prop_blp)
+    restapi.register_blueprint(job_blp)
@@ -7,6 +7,7 @@ from flask_smorest import Blueprint
 from ... import db
 from ... import schemas as sch
 from ... import models as mdl
+from .item import refresh_item_meta
 from .utils import admin_required, check_dependencies, check_duplicate
 
 blp = Blueprint("Cell", "Cell", url_prefix="/api/v1/cells", description="")
@@ -29,6 +30,9 @@ class Cell(MethodView):
         """Update cell"""
         cell = mdl.Cell.query.get_or_404(id)
         cell.update(data)
+        refresh_item_meta(
+            plate_id=db.session.query(mdl.Section.plate_id).filter(mdl.Section.cell_id == id)
+        )
         db.session.commit()
 
         return cell
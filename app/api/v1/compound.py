@@ -5,6 +5,7 @@ from flask_smorest import Blueprint
 from ... import db
 from ... import models as mdl
 from ... import schemas as sch
+from .item import refresh_item_meta
 from .utils import admin_required, check_dependencies, check_duplicate
 
 blp = Blueprint(
@@ -32,6 +33,11 @@ class Compound(MethodView):
         """Update compound"""
         cpd = mdl.Compound.query.get_or_404(id)
         cpd.update(data)
+        refresh_item_meta(
+            plate_id=db.session.query(mdl.Section.plate_id).filter(
+                mdl.Section.compound_id == id
+            )
+        )
 
         return cpd
 
@@ -1,6 +1,8 @@
 from flask.views import MethodView
 from flask_smorest import Blueprint
 
+from app.extensions import property_cache
+
 from ... import db
 from ... import models as mdl
 from ... import schemas as sch
@@ -34,6 +36,7 @@ class CompoundProperties(MethodView):
 
         prop = mdl.CompoundProperty(**data)
         db.session.add(prop)
+        property_cache.invalidate()
         db.session.commit()
 
         return prop
@@ -55,6 +58,8 @@ class CompoundProperty(MethodView):
         """Delete compound property"""
         res = mdl.CompoundProperty.query.get_or_404(id)
         db.session.delete(res)
+        property_cache.invalidate()
+        db.session.commit()
 
     @admin_required
     @blp.arguments(sch.CompoundPropertySchema)
@@ -64,5 +69,6 @@ class CompoundProperty(MethodView):
 
         prop =  mdl.CompoundProperty.query.get_or_404(id)
         prop.update(data)
+        property_cache.invalidate()
         db.session.commit()
         return prop
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+
+from flask_smorest import abort
+from sqlalchemy import Boolean, DateTime, Float, Integer
+
+MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _to_text(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _chunks(items, chunk_size):
+    """
+    Fetch rows of query by chunks through a server-side cursor
+    """
+
+    chunk = []
+    for row in items.yield_per(chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_ndjson(items, columns, chunk_size):
+    for chunk in _chunks(items, chunk_size):
+        yield "".join(
+            json.dumps({c: _to_text(v) for c, v in zip(columns, row)}) + "\n"
+            for row in chunk
+        )
+
+
+def write_csv(items, columns, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(items, chunk_size):
+        writer.writerows([[_to_text(v) for v in row] for row in chunk])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object whose content is drained after each write
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(pa, column_descriptions):
+    def arrow_type(type_):
+        if isinstance(type_, Integer):
+            return pa.int64()
+        if isinstance(type_, Float):
+            return pa.float64()
+        if isinstance(type_, Boolean):
+            return pa.bool_()
+        if isinstance(type_, DateTime):
+            return pa.timestamp("us", tz="UTC")
+        return pa.string()
+
+    return pa.schema(
+        [(c["name"], arrow_type(c["type"])) for c in column_descriptions]
+    )
+
+
+def _record_batches(pa, items, schema, chunk_size):
+    for chunk in _chunks(items, chunk_size):
+        columns = zip(*chunk)
+        arrays = [
+            pa.array(
+                [str(v) if isinstance(v, uuid.UUID) else v for v in values],
+                type=field.type,
+            )
+            for values, field in zip(columns, schema)
+        ]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_arrow(items, column_descriptions, chunk_size):
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa, column_descriptions)
+
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _record_batches(pa, items, schema, chunk_size):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def write_parquet(items, column_descriptions, chunk_size):
+    pa = _import_pyarrow()
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa, column_descriptions)
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in _record_batches(pa, items, schema, chunk_size):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        abort(501, message="Export to arrow/parquet requires package pyarrow.")
+    return pyarrow
+
+
+def export_items(items, format, chunk_size):
+    """
+    Serialize rows of query items as a stream of chunks in given format.
+    Rows are written as returned by the database, without schema dumping.
+    """
+
+    column_descriptions = items.column_descriptions
+    columns = [c["name"] for c in column_descriptions]
+
+    if format == "ndjson":
+        return write_ndjson(items, columns, chunk_size)
+    if format == "csv":
+        return write_csv(items, columns, chunk_size)
+
+    # fail before streaming starts
+    _import_pyarrow()
+    if format == "arrow":
+        return write_arrow(items, column_descriptions, chunk_size)
+    return write_parquet(items, column_descriptions, chunk_size)
@@ -1,16 +1,39 @@
 #!/usr/bin/env python3
+import base64
+import functools
+import json
+import uuid
+from datetime import datetime
 
 from ... import models as mdl
 from ... import schemas as sch
 
 from app.utils import record_exists
 from flask.views import MethodView
-from flask_smorest import Blueprint
-from sqlalchemy import func
+from flask_smorest import Blueprint, abort
+from sqlalchemy import (
+    Column,
+    MetaData,
+    Table,
+    and_,
+    distinct,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Query
 from sqlalchemy.sql.elements import literal_column
-from flask import current_app
+from sqlalchemy_utils.types.uuid import UUIDType
+from flask import Response, current_app, stream_with_context
 
 from ... import db
+from ...extensions import item_counts, property_cache
+from .export import MIMETYPES, export_items
 
 blp = Blueprint("Items", "Items", url_prefix="/api/v1/items", description="")
 blp.DEFAULT_PAGINATION_PARAMETERS = {
@@ -20,20 +43,24 @@ blp.DEFAULT_PAGINATION_PARAMETERS = {
 }
 
 
-def get_items_with_meta():
-    from ... import db
+def _aggregate_tags():
+    """Comma separated tag names (sqlite and postgre)"""
 
-    # aggregate tags (sqlite and postgre)
     url = str(db.engine.url)
     if "sqlite" in url:
-        my_string_agg_fn = func.group_concat(mdl.Tag.name, ",").label("tags")
+        return func.group_concat(mdl.Tag.name, ",")
     elif "postgre" in url:
-        my_string_agg_fn = func.string_agg(mdl.Tag.name, literal_column("','")).label(
-            "tags"
-        )
+        return func.string_agg(mdl.Tag.name, literal_column("','"))
     else:
         raise NotImplementedError
 
+
+def _join_items_with_meta():
+    from ... import db
+
+    # aggregate tags (sqlite and postgre)
+    my_string_agg_fn = _aggregate_tags().label("tags")
+
     items = (
         db.session.query(
             mdl.Item.id,
@@ -42,6 +69,7 @@ def get_items_with_meta():
             mdl.Item.col,
             mdl.Item.site,
             mdl.Item.chan,
+            mdl.Item.missing,
             mdl.Plate.id.label("plate_id"),
             mdl.Plate.name.label("plate_name"),
             mdl.Cell.name.label("cell_name"),
@@ -55,6 +83,10 @@ def get_items_with_meta():
             mdl.TimePoint.time.label("timepoint_time"),
             mdl.TimePoint.id.label("timepoint_id"),
             mdl.Section.id.label("section_id"),
+            mdl.Cell.id.label("cell_id"),
+            mdl.Stack.id.label("stack_id"),
+            mdl.Modality.id.label("modality_id"),
+            mdl.Compound.id.label("compound_id"),
             my_string_agg_fn,
         )
         .join(mdl.Plate, mdl.Plate.id == mdl.Item.plate_id)
@@ -75,7 +107,7 @@ def get_items_with_meta():
             mdl.Item.col >= mdl.Section.col_start,
             mdl.Item.col <= mdl.Section.col_end,
         )
-        .order_by(mdl.TimePoint.time, mdl.Item.row, mdl.Item.col, mdl.Item.site, mdl.Item.chan)
+        .order_by(*_sort_keys(join=True))
         .group_by(mdl.Item.id, mdl.Plate.id, mdl.TimePoint.id, mdl.Section.id, mdl.Cell.id,
                   mdl.Stack.id, mdl.StackModalityAssociation.id, mdl.Modality.id,
                   mdl.Compound.id, mdl.CompoundProperty.id)
@@ -84,73 +116,482 @@ def get_items_with_meta():
     return items
 
 
+def _query_item_meta():
+    return db.session.query(*mdl.ItemMeta.__table__.c).order_by(
+        *_sort_keys(join=False)
+    )
+
+
+def _sort_keys(join=None):
+    """
+    Columns that define the ordering of item listings, last one is unique
+    """
+
+    if join is None:
+        join = not current_app.config["ITEM_META_TABLE"]
+    if join:
+        return [mdl.TimePoint.time, mdl.Item.row, mdl.Item.col, mdl.Item.site,
+                mdl.Item.chan, mdl.Item.id]
+
+    meta = mdl.ItemMeta
+    return [meta.timepoint_time, meta.row, meta.col, meta.site, meta.chan, meta.id]
+
+
+def encode_cursor(item) -> str:
+    """
+    Build opaque cursor from sort keys of an item
+    """
+
+    keys = [item.timepoint_time.isoformat(), item.row, item.col, item.site,
+            item.chan, str(item.id)]
+    return base64.urlsafe_b64encode(json.dumps(keys).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    Sort keys of the item a cursor was built from, 422 if it is malformed
+    """
+
+    try:
+        time, row, col, site, chan, id = json.loads(base64.urlsafe_b64decode(cursor))
+        if not isinstance(row, (str, type(None))) or not all(
+            isinstance(v, (int, type(None))) and not isinstance(v, bool)
+            for v in (col, site, chan)
+        ):
+            raise TypeError("Invalid types of sort keys")
+        return [datetime.fromisoformat(time), row, col, site, chan, uuid.UUID(id)]
+    except (TypeError, ValueError):
+        abort(422, message="Invalid cursor {}.".format(cursor))
+
+
+def apply_cursor(items, cursor: str):
+    """
+    Restrict items to those that come after cursor (keyset pagination)
+    """
+
+    if not cursor:
+        return items
+
+    keys = _sort_keys()
+    values = [literal(v, type_=k.type) for k, v in zip(keys, decode_cursor(cursor))]
+    if "sqlite" in str(db.engine.url):
+        # sqlite stores timestamps as strings, whose format differs between
+        # server defaults and bound parameters
+        keys[0] = func.strftime("%Y-%m-%d %H:%M:%f", keys[0])
+        values[0] = func.strftime("%Y-%m-%d %H:%M:%f", values[0])
+
+    return items.filter(tuple_(*keys) > tuple_(*values))
+
+
+def get_items_with_meta():
+    """
+    Query items with their meta-data (plate, section, cell, compound, ...).
+    Reads from the item_meta table when ITEM_META_TABLE is set, and
+    joins all tables otherwise.
+    """
+
+    if current_app.config["ITEM_META_TABLE"]:
+        return _query_item_meta()
+
+    return _join_items_with_meta()
+
+
+def filter_items_by_parent(items, model, id):
+    """
+    Restrict items to those related to object of type model with given id
+    """
+
+    if not current_app.config["ITEM_META_TABLE"]:
+        return items.filter(model.id == id)
+
+    if model is mdl.Item:
+        return items.filter(mdl.ItemMeta.id == id)
+    if model is mdl.Tag:
+        tagged = db.session.query(mdl.ItemTagAssociation.item_id).filter(
+            mdl.ItemTagAssociation.tag_id == id
+        )
+        return items.filter(mdl.ItemMeta.id.in_(tagged))
+
+    field = getattr(mdl.ItemMeta, f"{model.__tablename__}_id")
+    return items.filter(field == id)
+
+
+def _in_or_equal(column, value):
+    if isinstance(value, (list, tuple, set, Query)):
+        return column.in_(value)
+    return column == value
+
+
+def _matching(model, criteria, wells):
+    """Filters of model (Item or ItemMeta) by criteria and wells"""
+
+    clauses = [_in_or_equal(getattr(model, k), v) for k, v in criteria.items()]
+    if wells:
+        clauses.append(
+            or_(
+                *[
+                    and_(model.row.between(r0, r1), model.col.between(c0, c1))
+                    for r0, r1, c0, c1 in wells
+                ]
+            )
+        )
+    return clauses
+
+
+def refresh_item_meta(wells=None, **criteria):
+    """
+    Rebuild rows of table item_meta for items that match criteria.
+
+    Criteria are given as column name of Item (e.g. plate_id, timepoint_id, id)
+    and value, where value can also be a list or a query of values.
+    wells: list of (row_start, row_end, col_start, col_end), ends included,
+    further restricts items to those in one of these rectangles.
+    Rows of items that do not match the join anymore (e.g. deleted section)
+    are dropped. Without criteria, the whole table is rebuilt.
+    Cached item counts are invalidated, the table is left unchanged
+    unless ITEM_META_TABLE is set.
+    """
+
+    item_counts.invalidate()
+    if not current_app.config["ITEM_META_TABLE"]:
+        return
+
+    meta = mdl.ItemMeta
+    stale = db.session.query(meta)
+    fresh = _join_items_with_meta().order_by(None)
+    if criteria or wells:
+        matching_items = db.session.query(mdl.Item.id).filter(
+            *_matching(mdl.Item, criteria, wells)
+        )
+        stale = stale.filter(
+            or_(meta.id.in_(matching_items), and_(*_matching(meta, criteria, wells)))
+        )
+        fresh = fresh.filter(*_matching(mdl.Item, criteria, wells))
+
+    stale.delete(synchronize_session=False)
+
+    columns = [c["name"] for c in fresh.column_descriptions]
+    db.session.execute(
+        meta.__table__.insert().from_select(columns, fresh.statement)
+    )
+
+
+def refresh_item_meta_tags(item_ids):
+    """
+    Recompute column tags of item_meta rows with ids in item_ids (a select),
+    in one UPDATE. Cached item counts are invalidated, the table is left
+    unchanged unless ITEM_META_TABLE is set.
+    """
+
+    item_counts.invalidate()
+    if not current_app.config["ITEM_META_TABLE"]:
+        return
+
+    meta = mdl.ItemMeta
+    tags = (
+        select(_aggregate_tags())
+        .select_from(mdl.ItemTagAssociation)
+        .join(mdl.Tag, mdl.Tag.id == mdl.ItemTagAssociation.tag_id)
+        .where(mdl.ItemTagAssociation.item_id == meta.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(meta).where(meta.id.in_(item_ids)).values(tags=tags),
+        execution_options={"synchronize_session": False},
+    )
+
+
+TAG_FILTERS = ("tags", "tags_any", "tags_all", "tags_none")
+
+
+def _tagged_items(names):
+    """Ids of items tagged with any of names"""
+
+    return (
+        select(mdl.ItemTagAssociation.item_id)
+        .join(mdl.Tag, mdl.Tag.id == mdl.ItemTagAssociation.tag_id)
+        .where(mdl.Tag.name.in_(names))
+    )
+
+
+def filter_items_by_tags(items, item_id, any_=(), all_=(), none=()):
+    """
+    Filter items that have any of tags any_, all tags all_ and none of tags
+    none, as semi-joins on item_tag_assoc.
+
+    item_id: column of items with the item id
+    """
+
+    if any_:
+        items = items.filter(item_id.in_(_tagged_items(set(any_))))
+    if all_:
+        all_ = set(all_)
+        items = items.filter(
+            item_id.in_(
+                _tagged_items(all_)
+                .group_by(mdl.ItemTagAssociation.item_id)
+                .having(func.count(distinct(mdl.Tag.name)) == len(all_))
+            )
+        )
+    if none:
+        items = items.filter(item_id.not_in(_tagged_items(set(none))))
+
+    return items
+
+
+def _apply_tag_filters(items, item_id, query_args):
+    """Apply tag filters of query_args and return remaining arguments"""
+
+    tags = {k: query_args[k] for k in TAG_FILTERS if query_args.get(k)}
+    if tags:
+        any_ = list(tags.get("tags_any", []))
+        if "tags" in tags:
+            any_.append(tags["tags"])
+        items = filter_items_by_tags(
+            items,
+            item_id,
+            any_=any_,
+            all_=tags.get("tags_all", ()),
+            none=tags.get("tags_none", ()),
+        )
+
+    query_args = {k: v for k, v in query_args.items() if k not in TAG_FILTERS}
+    return items, query_args
+
+
+@functools.lru_cache()
+def filter_columns(item_meta: bool = False) -> dict:
+    """
+    Columns filtered by query arguments, resolved once from the models.
+
+    With item_meta, arguments are columns of table item_meta. Otherwise
+    they are "<table>_<column>" (e.g. plate_name), or columns of table item
+    when there is no table prefix.
+    """
+
+    if item_meta:
+        columns = {c.key: c.class_attribute for c in mdl.ItemMeta.__mapper__.column_attrs}
+        # stack is the name of the stack, filtered as stack_name by the join
+        columns["stack_name"] = mdl.ItemMeta.stack
+        return columns
+
+    columns = {}
+    for mapper in db.Model.registry.mappers:
+        table_name = mapper.class_.__tablename__
+        # the table prefix ends at the first underscore
+        if "_" in table_name:
+            continue
+        for c in mapper.column_attrs:
+            columns[f"{table_name}_{c.key}"] = c.class_attribute
+    for c in mdl.Item.__mapper__.column_attrs:
+        columns[c.key] = c.class_attribute
+
+    return columns
+
+
+def _filter_compound_property(items, property_id, field, v):
+    """Filter items whose compound has property field = v, or a descendant of it"""
+
+    descendants = property_cache.get().descendants(field, v)
+    if descendants is None:
+        return items.filter(False)
+
+    return items.filter(property_id.in_(descendants))
+
+
 def apply_query_args(db, items, query_args):
+    """
+    Filter items by query arguments.
+
+    Values are bound parameters, so queries with the same arguments
+    (whatever their values) share a compiled statement in the engine cache.
+    """
+
+    item_meta = current_app.config["ITEM_META_TABLE"]
+    if item_meta:
+        item_id, property_id = mdl.ItemMeta.id, mdl.ItemMeta.compound_property_id
+    else:
+        item_id, property_id = mdl.Item.id, mdl.CompoundProperty.id
+
+    # tags -> semi-joins on tag associations
+    items, query_args = _apply_tag_filters(items, item_id, query_args)
 
+    columns = filter_columns(item_meta)
     for k, v in query_args.items():
-        # fetch all registered models
-        models = [mapper.class_ for mapper in db.Model.registry.mappers]
-
-        # case 1: left of underscore is the name of table/model
-        # case 2: tags -> use regexp
-        # case 3: no underscore -> use table "item"
-        # case 4: table/model combination is invalid, check for compound property
-        if "_" in k:
-            elements = k.split("_")
-            table_name = elements[0]
-            field = "_".join(elements[1:])
-        elif k == 'tags':
-            table_name = 'tag'
-            field = 'name'
-            items = items.subquery()
-            # tag name can be followed by a comma (when it has other tags)
-            items = db.session.query(items).filter(items.c.tags.regexp_match(f'({v},)|({v}$)'))
-        else:
-            table_name = "item"
-            field = k
-
-        model = [m for m in models if m.__tablename__ == table_name][0]
-        model_has_attr = hasattr(model, field)
-        if model_has_attr:
-            field = getattr(model, field)
-            items = items.filter(field == v)
+        if k in columns:
+            items = items.filter(columns[k] == v)
+            continue
+
+        # otherwise, fetch in compound_property for matching attribute
+        if item_meta:
+            field = k[len("compound_"):] if k.startswith("compound_") else k
         else:
-            # case 4: fetch in compound_property for matching attribute
-            compound_property = mdl.CompoundProperty.query.filter(
-                mdl.CompoundProperty.type == field
-            ).filter(mdl.CompoundProperty.value == v)
-
-            found_matching_property = compound_property.count() > 0
-            if found_matching_property:
-                matching_property = compound_property.first()
-                items = items.filter(
-                    mdl.CompoundProperty.left >= matching_property.left
-                ).filter(mdl.CompoundProperty.right <= matching_property.right)
-            else:
-                items = items.filter(False)
+            field = k.split("_", 1)[-1]
+        items = _filter_compound_property(items, property_id, field, v)
 
     return items
 
 
+def count_key(args: dict) -> str:
+    """Normalized filter set of query args, identifies cached counts"""
+
+    return json.dumps(
+        {k: sorted(v) if isinstance(v, list) else v for k, v in args.items()},
+        sort_keys=True,
+        default=str,
+    )
+
+
 @blp.route("/")
 class Items(MethodView):
     @blp.arguments(sch.ItemSchema, location="query")
-    @blp.paginate()
+    @blp.arguments(sch.ItemPageSchema, location="query", as_kwargs=True)
     @blp.response(200, sch.ItemSchema(many=True))
-    def get(self, args, pagination_parameters):
+    def get(self, args, page, page_size, after=None, count=None, count_mode=None):
         """Get items
 
         Provides list of items with associated meta-data.
+        Paginate with page/page_size, or with cursor: pass an empty "after"
+        for the first page, then the "next_after" value of the X-Pagination
+        header to fetch the next one.
+        The count_mode of the total is reported in the X-Pagination header:
+        estimated counts fall back to exact ones when the database provides
+        no estimate.
         """
 
         items = get_items_with_meta()
+        count_mode = count_mode or current_app.config["API_ITEMS_COUNT_MODE"]
+
+        if after is None:
+            items = apply_query_args(db, items, args)
+            item_count, count_mode = item_counts.count(
+                items, count_key(args), count_mode
+            )
+            items = items.paginate(page=page, per_page=page_size, count=False).items
+            metadata = blp._make_pagination_metadata(page, page_size, item_count)
+            metadata["count_mode"] = count_mode
+            return items, {"X-Pagination": json.dumps(metadata)}
+
         items = apply_query_args(db, items, args)
 
-        pagination_parameters.item_count = items.count()
-        items = items.paginate(
-            page=pagination_parameters.page, per_page=pagination_parameters.page_size
-        ).items
+        metadata = {"page_size": page_size}
+        if count:
+            # total of all pages, the same for each cursor
+            metadata["total"], metadata["count_mode"] = item_counts.count(
+                items, count_key(args), count_mode
+            )
+        items = apply_cursor(items, after)
+        items = items.limit(page_size).all()
+        if len(items) == page_size:
+            metadata["next_after"] = encode_cursor(items[-1])
 
-        return items
+        return items, {"X-Pagination": json.dumps(metadata)}
+
+
+@blp.route("/export")
+class ItemsExport(MethodView):
+    @blp.arguments(sch.ItemSchema, location="query")
+    @blp.arguments(sch.ItemExportSchema, location="query", as_kwargs=True)
+    @blp.response(200)
+    def get(self, args, format, chunk_size):
+        """Export items
+
+        Streams all items that match query with their meta-data, as
+        newline-delimited JSON, CSV, Parquet or Arrow IPC stream.
+        """
+
+        items = get_items_with_meta()
+        items = apply_query_args(db, items, args)
+
+        return Response(
+            stream_with_context(export_items(items, format, chunk_size)),
+            mimetype=MIMETYPES[format],
+            headers={
+                "Content-Disposition": f"attachment; filename=items.{format}"
+            },
+        )
+
+
+def _item_ids(items):
+    """Select of ids of items, a query returned by get_items_with_meta"""
+
+    item_id = mdl.ItemMeta.id if current_app.config["ITEM_META_TABLE"] else mdl.Item.id
+    return items.with_entities(item_id.label("id")).order_by(None).subquery()
+
+
+def _insert_ignoring_conflicts(table):
+    url = str(db.engine.url)
+    if "sqlite" in url:
+        return sqlite.insert(table).on_conflict_do_nothing()
+    elif "postgre" in url:
+        return postgresql.insert(table).on_conflict_do_nothing()
+    else:
+        raise NotImplementedError
+
+
+def tag_items(items, tag_id):
+    """
+    Tag items (a query returned by get_items_with_meta) in one
+    INSERT ... SELECT, skipping items that already have the tag
+    """
+
+    ids = _item_ids(items)
+    # WHERE avoids SQLite's ambiguity between ON CONFLICT and join constraints
+    tag_id = literal(tag_id, mdl.ItemTagAssociation.tag_id.type)
+    tagged = select(ids.c.id, tag_id).where(true())
+    db.session.execute(
+        _insert_ignoring_conflicts(mdl.ItemTagAssociation.__table__).from_select(
+            ["item_id", "tag_id"], tagged
+        )
+    )
+
+
+def untag_items(items, tag_id):
+    """Remove tag from items (a query returned by get_items_with_meta) in one DELETE"""
+
+    assoc = mdl.ItemTagAssociation
+    db.session.query(assoc).filter(
+        assoc.tag_id == tag_id, assoc.item_id.in_(select(_item_ids(items).c.id))
+    ).delete(synchronize_session=False)
+
+
+def _copy_to_temporary_table(ids):
+    """
+    Copy select of item ids to a temporary table (column id) of the
+    session's connection. The table is dropped by the caller, or with the
+    transaction when it is rolled back.
+    """
+
+    table = Table(
+        f"tmp_item_ids_{uuid.uuid4().hex}",
+        MetaData(),
+        Column("id", UUIDType, primary_key=True),
+        prefixes=["TEMPORARY"],
+    )
+    connection = db.session.connection()
+    table.create(connection)
+    connection.execute(table.insert().from_select(["id"], ids))
+    return table
+
+
+def _tag_items_and_refresh(items, args, tag_id, change):
+    """
+    Apply change (tag_items or untag_items) and refresh tags of item_meta.
+
+    Items are selected again by the refresh, unless the selection depends on
+    tags, since the change may alter it: ids are then copied beforehand to a
+    temporary table, without leaving the database.
+    """
+
+    if current_app.config["ITEM_META_TABLE"] and any(args.get(k) for k in TAG_FILTERS):
+        table = _copy_to_temporary_table(select(_item_ids(items).c.id))
+        ids = select(table.c.id)
+        change(db.session.query(mdl.ItemMeta).filter(mdl.ItemMeta.id.in_(ids)), tag_id)
+        refresh_item_meta_tags(ids)
+        table.drop(db.session.connection())
+    else:
+        change(items, tag_id)
+        refresh_item_meta_tags(select(_item_ids(items).c.id))
 
 
 @blp.route("/tag/<tag_name>")
@@ -159,18 +600,19 @@ class ItemTagger(MethodView):
     @blp.paginate()
     @blp.response(200)
     def post(self, args, tag_name, pagination_parameters):
-        """Tag items"""
+        """Tag items
+
+        Items that already have the tag are left unchanged.
+        """
 
         record_exists(db, mdl.Tag, tag_name, field="name")
-        id = db.session.query(mdl.Tag).filter(mdl.Tag.name == tag_name).first().id
+        id = db.session.query(mdl.Tag.id).filter(mdl.Tag.name == tag_name).scalar()
 
         items = get_items_with_meta()
-        items = apply_query_args(db, items, args).all()
-
-        pagination_parameters.item_count = len(items)
-        assocs = [mdl.ItemTagAssociation(item_id=i.id, tag_id=id) for i in items]
+        items = apply_query_args(db, items, args)
+        pagination_parameters.item_count = items.order_by(None).count()
 
-        db.session.add_all(assocs)
+        _tag_items_and_refresh(items, args, id, tag_items)
         db.session.commit()
         return ["applied tag {}".format(tag_name)]
 
@@ -181,18 +623,11 @@ class ItemTagger(MethodView):
         """Remove a tag from (set of) items"""
 
         record_exists(db, mdl.Tag, tag_name, field="name")
-        tag_id = db.session.query(mdl.Tag).filter(mdl.Tag.name == tag_name).first().id
+        tag_id = db.session.query(mdl.Tag.id).filter(mdl.Tag.name == tag_name).scalar()
 
         items = get_items_with_meta()
         items = apply_query_args(db, items, args)
-        pagination_parameters.item_count = items.count()
-
-        item_ids = [i.id for i in items]
-        assocs = (
-            db.session.query(mdl.ItemTagAssociation)
-            .filter(mdl.ItemTagAssociation.item_id.in_(item_ids))
-            .filter(mdl.ItemTagAssociation.tag_id == tag_id)
-            .delete()
-        )
+        pagination_parameters.item_count = items.order_by(None).count()
 
+        _tag_items_and_refresh(items, args, tag_id, untag_items)
         db.session.commit()
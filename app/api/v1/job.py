@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+from flask.views import MethodView
+from flask_smorest import Blueprint
+
+from ... import models as mdl
+from ... import schemas as sch
+
+blp = Blueprint(
+    "Job", "Job", url_prefix="/api/v1/jobs", description="Background jobs, e.g. ingestion of timepoints"
+)
+
+
+@blp.route("/<uuid:id>")
+class Job(MethodView):
+    @blp.response(200, sch.JobSchema)
+    def get(self, id):
+        """Get job, with progress and errors"""
+
+        return mdl.Job.query.get_or_404(id)
+
+
+@blp.route("/")
+class Jobs(MethodView):
+    @blp.response(200, sch.JobSchema(many=True))
+    def get(self):
+        """Get all jobs"""
+
+        return mdl.Job.query.order_by(mdl.Job.created.desc()).all()
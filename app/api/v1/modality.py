@@ -7,6 +7,7 @@ from flask.views import MethodView
 from flask_smorest import Blueprint
 
 from ... import db
+from .item import refresh_item_meta
 from .utils import admin_required, check_dependencies, check_duplicate
 
 blp = Blueprint(
@@ -35,6 +36,12 @@ class Modality(MethodView):
 
         res = mdl.Modality.query.get_or_404(id)
         res.update(update_data)
+        refresh_item_meta(
+            plate_id=db.session.query(mdl.Plate.id)
+            .join(mdl.StackModalityAssociation,
+                  mdl.StackModalityAssociation.stack_id == mdl.Plate.stack_id)
+            .filter(mdl.StackModalityAssociation.modality_id == id)
+        )
         db.session.commit()
 
         return res
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 
+import csv
+import io
+
 from app.extensions import db
-from flask import jsonify
+from flask import jsonify, request
 from flask.views import MethodView
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
+from marshmallow import ValidationError
 
 from ... import models as mdl
 from ... import schemas as sch
 from ...exceptions import MyException
-from .section import create_section, delete_section
+from .section import create_section, delete_section, import_layout
+from .item import refresh_item_meta
 from .timepoint import create_timepoint
 from .utils import admin_required, check_duplicate
 
@@ -34,12 +39,17 @@ class TimePointsOfPlate(MethodView):
         plate = mdl.Plate.query.get_or_404(id)
         for tp in plate.timepoints:
             db.session.delete(tp)
+        refresh_item_meta(plate_id=id)
 
     @admin_required
     @blp.arguments(sch.TimePointSchema)
-    @blp.response(201, sch.TimePointSchema)
+    @blp.response(202, sch.JobSchema)
     def post(self, data, id):
-        """Add a new timepoint"""
+        """Add a new timepoint
+
+        Items are parsed and inserted by a background job, whose status
+        is available at /jobs/<id>.
+        """
 
         data["plate_id"] = id
         res = create_timepoint(data)
@@ -81,6 +91,49 @@ class SectionsOfPlate(MethodView):
         return res
 
 
+def load_layout():
+    """Load plate layout from JSON list or CSV table of request"""
+
+    if request.mimetype == "text/csv":
+        reader = csv.DictReader(io.StringIO(request.get_data(as_text=True)))
+        # empty cells are missing values
+        layout = [{k: v for k, v in row.items() if v != ""} for row in reader]
+    else:
+        layout = request.get_json(silent=True)
+        if not isinstance(layout, list):
+            abort(422, message="Expected a list of sections.")
+
+    try:
+        return sch.SectionLayoutSchema(many=True).load(layout)
+    except ValidationError as e:
+        abort(422, errors=e.messages)
+
+
+@blp.route("/<uuid:id>/layout")
+class LayoutOfPlate(MethodView):
+    @admin_required
+    @blp.arguments(sch.SectionLayoutArgsSchema, location="query")
+    @blp.doc(
+        requestBody={
+            "content": {
+                "application/json": {"schema": sch.SectionLayoutSchema(many=True)},
+                "text/csv": {"schema": {"type": "string"}},
+            }
+        }
+    )
+    @blp.response(201, sch.SectionLayoutSchema(many=True))
+    def post(self, args, id):
+        """Add all sections of a plate layout
+
+        Sections are given as a JSON list, or as a CSV table with columns
+        row_start, row_end, col_start, col_end, cell_code, compound_name and
+        compound_concentration. They are validated together and created in
+        a single transaction.
+        """
+
+        return import_layout(id, load_layout(), replace=args["replace"])
+
+
 @blp.route("/<uuid:id>")
 class Plate(MethodView):
     model = mdl.Plate
@@ -98,6 +151,7 @@ class Plate(MethodView):
         """Update plate."""
         q = mdl.Plate.query.get_or_404(id)
         q.update(data)
+        refresh_item_meta(plate_id=id)
         db.session.commit()
 
         return q
@@ -110,6 +164,7 @@ class Plate(MethodView):
         res = mdl.Plate.query.get_or_404(id)
 
         db.session.delete(res)
+        refresh_item_meta(plate_id=id)
 
         db.session.commit()
 
@@ -4,10 +4,12 @@ from flask_smorest import Blueprint
 from app.utils import record_exists
 from flask.views import MethodView
 from flask_smorest import abort
+from sqlalchemy import and_
 
 from ... import db
 from ... import models as mdl
 from ... import schemas as sch
+from .item import refresh_item_meta
 from .utils import admin_required
 
 blp = Blueprint(
@@ -17,6 +19,48 @@ blp = Blueprint(
     description="Spatially contiguous subset of wells in a plate",
 )
 
+def plate_extent(plate_id):
+    """
+    Smallest and largest row and column of items of plate, in a single
+    aggregate query (Nones if plate has no items)
+    """
+
+    return (
+        db.session.query(
+            db.func.min(mdl.Item.row),
+            db.func.max(mdl.Item.row),
+            db.func.min(mdl.Item.col),
+            db.func.max(mdl.Item.col),
+        )
+        .filter(mdl.Item.plate_id == plate_id)
+        .one()
+    )
+
+
+def within_bounds(bounds, section):
+    """
+    Whether section lies within the extent of the plate, ends included
+
+    bounds: as returned by plate_extent
+    section: dict that contains keys row_start, row_end, col_start, col_end
+    """
+
+    min_row, max_row, min_col, max_col = bounds
+    return (
+        min_row <= section["row_start"] <= section["row_end"] <= max_row
+        and min_col <= section["col_start"] <= section["col_end"] <= max_col
+    )
+
+
+def _wells_of(section):
+    """Rectangle of wells of section (a dict or a record), for refresh_item_meta"""
+
+    keys = ("row_start", "row_end", "col_start", "col_end")
+    if isinstance(section, dict):
+        return tuple(section[k] for k in keys)
+    return tuple(getattr(section, k) for k in keys)
+
+
 def _check_range(plate_id, a):
     """
     check that requested range contained in a matches available range of plate with ID timepoint_id
@@ -25,54 +69,119 @@ def _check_range(plate_id, a):
     """
 
     # get row and col range of plate
-    plate = db.session.query(mdl.Plate).filter_by(id=a["plate_id"]).first()
-    items = plate.items
-    rows = [im.row for im in items]
-    cols = [im.col for im in items]
-    row_range = range(ord(min(rows)), ord(max(rows)))
-    col_range = range(min(cols), max(cols))
+    bounds = plate_extent(a["plate_id"])
+    if bounds[0] is None:
+        abort(409, message="Plate with id {} has no items.".format(plate_id))
 
     # compare with requested range
-    if not range_subset(
-        range(ord(a["row_start"]), ord(a["row_end"])), row_range
-    ) and range_subset(range(a["col_start"], a["col_end"]), col_range):
+    if not within_bounds(bounds, a):
+        min_row, max_row, min_col, max_col = bounds
         abort(
             409,
             message="Requested section is out of bounds for plate with id {} within rows: {}, cols: {}.".format(
                 plate_id,
-                (chr(row_range.start), chr(row_range.stop)),
-                (col_range.start, col_range.stop),
+                (min_row, max_row),
+                (min_col, max_col),
             ),
         )
 
-def _check_overlap(a, b):
+def overlaps(section):
+    """
+    SQL predicate: section rectangle overlaps rectangle of dict section,
+    bounds included
+    """
+
+    return and_(
+        mdl.Section.row_start <= section["row_end"],
+        mdl.Section.row_end >= section["row_start"],
+        mdl.Section.col_start <= section["col_end"],
+        mdl.Section.col_end >= section["col_start"],
+    )
+
+
+def _check_overlap(plate_id, section):
     """
-    check if new section overlaps existing sections
+    check if new section overlaps existing sections of plate
 
-    a, b: dicts that contain keys row_start, row_end, col_start, col_end
+    section: dict that contains keys row_start, row_end, col_start, col_end
     """
-    section_coords = make_grid(**a)
-    new_section_coords = make_grid(**b)
 
-    if set(section_coords) & set(new_section_coords):
+    overlapping = db.session.query(mdl.Section.id).filter(
+        mdl.Section.plate_id == plate_id, overlaps(section)
+    )
+    if overlapping.first() is not None:
         abort(409, message="Requested section overlaps with existing section.")
 
-def range_subset(range1, range2):
-    """Whether range1 is a subset of range2."""
-    if not range1:
-        return True  # empty range is subset of anything
-    if not range2:
-        return False  # non-empty range can't be subset of empty range
-    if len(range1) > 1 and range1.step % range2.step:
-        return False  # must have a single value or integer multiple step
-    return range1.start in range2 and range1[-1] in range2
 
+def find_overlaps(sections):
+    """
+    Pairs of indices (i, j), i < j, of overlapping sections.
+
+    Sweeps sections by row_start and keeps the sections whose rows are still
+    open, so that only sections sharing rows are compared by columns.
+
+    sections: dicts that contain keys row_start, row_end, col_start, col_end
+    """
 
-def make_grid(row_start, row_end, col_start, col_end, *args, **kwargs):
-    row_range = [i for i in range(ord(row_start), ord(row_end) + 1)]
-    col_range = [i for i in range(col_start, col_end + 1)]
-    coordinates = [(r, c) for r in row_range for c in col_range]
-    return coordinates
+    order = sorted(range(len(sections)), key=lambda i: sections[i]["row_start"])
+    active = []
+    pairs = []
+    for i in order:
+        s = sections[i]
+        active = [j for j in active if sections[j]["row_end"] >= s["row_start"]]
+        for j in active:
+            t = sections[j]
+            if t["col_start"] <= s["col_end"] and s["col_start"] <= t["col_end"]:
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+
+    return sorted(pairs)
+
+
+def check_layout(plate_id, sections, replace=False):
+    """
+    Validate a whole layout of plate at once: bounds of each section, overlaps
+    between sections, and with existing sections of plate unless they are
+    replaced. Aborts with 409 and the list of conflicts.
+    """
+
+    bounds = plate_extent(plate_id)
+    if bounds[0] is None:
+        abort(409, message="Plate with id {} has no items.".format(plate_id))
+
+    existing = []
+    if not replace:
+        existing = [
+            dict(row_start=r0, row_end=r1, col_start=c0, col_end=c1)
+            for r0, r1, c0, c1 in db.session.query(
+                mdl.Section.row_start,
+                mdl.Section.row_end,
+                mdl.Section.col_start,
+                mdl.Section.col_end,
+            ).filter(mdl.Section.plate_id == plate_id)
+        ]
+
+    errors = []
+    for i, section in enumerate(sections):
+        if (
+            section["row_start"] > section["row_end"]
+            or section["col_start"] > section["col_end"]
+        ):
+            errors.append({"section": i, "error": "start after end"})
+        elif not within_bounds(bounds, section):
+            errors.append({"section": i, "error": "out of bounds"})
+
+    n_new = len(sections)
+    for i, j in find_overlaps(list(sections) + existing):
+        if i >= n_new:
+            continue
+        if j < n_new:
+            errors.append({"section": i, "error": f"overlaps section {j}"})
+        else:
+            errors.append({"section": i, "error": "overlaps existing section"})
+
+    if errors:
+        abort(409, message="Invalid plate layout.", errors=errors)
 
 
 def create_section(data):
@@ -82,22 +191,77 @@ def create_section(data):
     _check_range(data["plate_id"], data)
 
     # check for overlap with existing sections of same plate
-    existing_sections = (
-        db.session.query(mdl.Plate).filter_by(id=data["plate_id"]).first().sections
-    )
-    for s in existing_sections:
-        _check_overlap(s.__dict__, data)
+    _check_overlap(data["plate_id"], data)
 
     section = mdl.Section(**data)
     db.session.add(section)
+    refresh_item_meta(plate_id=data["plate_id"], wells=[_wells_of(data)])
     db.session.commit()
 
     return section
 
+def _ids_by(model, field, values):
+    """Map values of field to ids of model in one IN query, 404 if any is unknown"""
+
+    ids = dict(
+        db.session.query(getattr(model, field), model.id).filter(
+            getattr(model, field).in_(set(values))
+        )
+    )
+    unknown = sorted(set(values) - set(ids))
+    if unknown:
+        abort(
+            404,
+            message="Requested items of type {} with field {} not found: {}.".format(
+                model.__name__, field, ", ".join(unknown)
+            ),
+        )
+    return ids
+
+
+def import_layout(plate_id, layout, replace=False):
+    """
+    Create all sections of a plate layout in one transaction.
+
+    layout: dicts loaded by SectionLayoutSchema
+    replace: delete existing sections of plate first
+    """
+
+    record_exists(db, mdl.Plate, plate_id)
+    cell_ids = _ids_by(mdl.Cell, "code", [s["cell_code"] for s in layout])
+    compound_ids = _ids_by(mdl.Compound, "name", [s["compound_name"] for s in layout])
+
+    check_layout(plate_id, layout, replace=replace)
+
+    if replace:
+        db.session.query(mdl.Section).filter(mdl.Section.plate_id == plate_id).delete(
+            synchronize_session=False
+        )
+
+    sections = []
+    for s in layout:
+        s = dict(s, plate_id=plate_id)
+        s["cell_id"] = cell_ids[s.pop("cell_code")]
+        s["compound_id"] = compound_ids[s.pop("compound_name")]
+        sections.append(mdl.Section(**s))
+
+    db.session.add_all(sections)
+    db.session.flush()
+    # replaced sections may cover any well of the plate
+    wells = None if replace else [_wells_of(s) for s in layout]
+    refresh_item_meta(plate_id=plate_id, wells=wells)
+    db.session.commit()
+
+    return [
+        dict(s, id=section.id, plate_id=plate_id) for s, section in zip(layout, sections)
+    ]
+
+
 def delete_section(id):
     res = record_exists(db, mdl.Section, id, field="id").first()
 
     db.session.delete(res)
+    refresh_item_meta(plate_id=res.plate_id, wells=[_wells_of(res)])
     db.session.commit()
 
 def update_section(id, data):
@@ -124,9 +288,15 @@ def update_section(id, data):
         data.pop("stack_name", None)
 
     elem = db.session.query(mdl.Section).filter_by(id=id)
+    section = mdl.Section.query.get_or_404(id)
 
     if data:
+        # items of the section before and after the update
+        wells = [_wells_of(section)]
         elem.update(data)
+        db.session.refresh(section)
+        wells.append(_wells_of(section))
+        refresh_item_meta(plate_id=section.plate_id, wells=wells)
         db.session.commit()
     return elem
 
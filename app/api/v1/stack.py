@@ -7,6 +7,7 @@ from flask_smorest import Blueprint, abort
 from ... import db
 from ... import models as mdl
 from ...schemas import StackSchema
+from .item import refresh_item_meta
 from .utils import admin_required, check_duplicate
 
 blp = Blueprint(
@@ -58,6 +59,9 @@ def reset_associations(stack_id, config):
         assoc.append(mdl.StackModalityAssociation(**data))
 
     db.session.add_all(assoc)
+    refresh_item_meta(
+        plate_id=db.session.query(mdl.Plate.id).filter(mdl.Plate.stack_id == stack_id)
+    )
     db.session.commit()
 
 
@@ -85,6 +89,9 @@ class Stack(MethodView):
         stack = mdl.Stack.query.get_or_404(id)
         if data_stack:
             stack.update(data_stack)
+            refresh_item_meta(
+                plate_id=db.session.query(mdl.Plate.id).filter(mdl.Plate.stack_id == id)
+            )
             db.session.commit()
 
         if data_assoc:
@@ -9,6 +9,7 @@ from flask_smorest import abort
 from ... import db
 from ... import models as mdl
 from ... import schemas as sch
+from .item import refresh_item_meta
 from .utils import admin_required, check_duplicate
 
 blp = Blueprint(
@@ -37,6 +38,11 @@ class Tag(MethodView):
         tag = mdl.Tag.query.get_or_404(id)
 
         tag.update(data)
+        refresh_item_meta(
+            id=db.session.query(mdl.ItemTagAssociation.item_id).filter(
+                mdl.ItemTagAssociation.tag_id == id
+            )
+        )
         db.session.commit()
         return tag
 
@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
-#!/usr/bin/env python3
+import functools
 
 from app.utils import record_exists
+from flask import current_app
 from flask.views import MethodView
 from flask_smorest import Blueprint
 
 from ... import db, parser
+from ...exceptions import MyException
+from ...extensions import jobs, thumbnails
+from ...ingest import sync_items
 from ... import models as mdl
 from ... import schemas as sch
+from .item import refresh_item_meta
 from .utils import admin_required, check_duplicate
 
 blp = Blueprint(
@@ -44,26 +49,104 @@ class TimePoint(MethodView):
         timepoint = mdl.TimePoint.query.get_or_404(id)
 
         db.session.delete(timepoint)
+        refresh_item_meta(timepoint_id=id)
 
         db.session.commit()
 
 
+def warm_thumbnails(timepoint):
+    """
+    Compute thumbnails of timepoint items if enabled by THUMBNAILS_ON_INGEST,
+    failures do not fail ingestion
+    """
+
+    if not current_app.config["THUMBNAILS_ON_INGEST"]:
+        return
+
+    uris = db.session.query(mdl.Item.uri).filter_by(
+        timepoint_id=timepoint.id, missing=False
+    )
+    try:
+        thumbnails.warm(uri for uri, in uris)
+    except MyException as e:
+        current_app.logger.warning(f"Thumbnails of {timepoint} failed: {e.message}")
+
+
+def ingest_timepoint(job, progress, data):
+    """
+    Create timepoint and its items, committed together by the job runner.
+    Thumbnails are computed once they are committed.
+    """
+
+    timepoint = mdl.TimePoint(**data)
+    db.session.add(timepoint)
+    db.session.flush()
+
+    counts = sync_items(parser.iter(timepoint.uri), timepoint, progress=progress)
+    # job is only modified once progress is reported, see JobRunner.submit
+    job.timepoint_id = timepoint.id
+    job.n_items = counts["new"]
+    refresh_item_meta(timepoint_id=timepoint.id)
+    return functools.partial(warm_thumbnails, timepoint)
+
+
+def sync_timepoint(job, progress, id, full):
+    """
+    List timepoint URI again, insert new items and flag missing ones
+    """
+
+    timepoint = db.session.get(mdl.TimePoint, id)
+    start_after = None if full else timepoint.last_key
+    full = full or start_after is None
+
+    counts = sync_items(
+        parser.iter(timepoint.uri, start_after=start_after),
+        timepoint,
+        full=full,
+        progress=progress,
+    )
+    job.n_items = counts["new"]
+    current_app.logger.info(f"Synchronized {timepoint}: {counts}")
+    refresh_item_meta(timepoint_id=timepoint.id)
+    return functools.partial(warm_thumbnails, timepoint)
+
+
 def create_timepoint(data):
+    """
+    Check request and submit a job that ingests the timepoint
+    """
+
     check_duplicate(db.session, mdl.TimePoint, uri=data["uri"])
     record_exists(db, mdl.Plate, data["plate_id"])
 
-    timepoint = mdl.TimePoint(**data)
-    db.session.add(timepoint)
+    job = mdl.Job(uri=data["uri"], plate_id=data["plate_id"])
+    db.session.add(job)
     db.session.commit()
 
-    items = parser(
-        base_uri=timepoint.uri,
-        plate_id=timepoint.plate_id,
-        timepoint_id=timepoint.id,
-    )
-    db.session.add_all(items)
+    jobs.submit(job, ingest_timepoint, data)
+
+    return db.session.get(mdl.Job, job.id)
+
+
+@blp.route("/<uuid:id>/sync")
+class TimePointSync(MethodView):
+    @admin_required
+    @blp.arguments(sch.TimePointSyncSchema, location="query")
+    @blp.response(202, sch.JobSchema)
+    def post(self, args, id):
+        """Re-scan timepoint URI for new and missing files"""
+
+        timepoint = mdl.TimePoint.query.get_or_404(id)
+
+        job = mdl.Job(
+            uri=timepoint.uri, plate_id=timepoint.plate_id, timepoint_id=timepoint.id
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        jobs.submit(job, sync_timepoint, timepoint.id, args["full"])
 
-    return timepoint
+        return db.session.get(mdl.Job, job.id)
 
 
 @blp.route("/")
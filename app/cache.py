@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+import json
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .query_plans import Explain
+
+
+def get_version(db, name: str) -> int:
+    """Current version stamp of cached resource name"""
+
+    from .models import CacheVersion
+
+    version = db.session.query(CacheVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def bump_version(db, name: str, session=None):
+    """
+    Increment version stamp of cached resource name, in a single upsert so
+    that concurrent first writers do not conflict.
+    Takes effect for other processes when the session (db.session by
+    default) is committed.
+    """
+
+    from .models import CacheVersion
+
+    insert = sqlite.insert if "sqlite" in str(db.engine.url) else postgresql.insert
+    statement = insert(CacheVersion.__table__).values(name=name, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": CacheVersion.__table__.c.version + 1},
+    )
+    (session or db.session).execute(statement)
+
+
+def after_commit(session, key, fn):
+    """
+    Call fn once the current transaction of session is committed, at most
+    once per key. Nothing is called if it is rolled back.
+    """
+
+    session.info.setdefault("after_commit", {})[key] = fn
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session):
+    for fn in session.info.pop("after_commit", {}).values():
+        fn()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session):
+    session.info.pop("after_commit", None)
+
+
+class PropertySnapshot:
+    """
+    Immutable copy of the compound property tree.
+
+    ancestors: id -> list of (type name, value), from root to node
+    ranges: (type name, value) -> (tree_id, left, right)
+    drilldown: list of root nodes with nested children, as JSON
+    """
+
+    def __init__(self, nodes):
+        by_id = {n.id: n for n in nodes}
+
+        self.ancestors = {}
+        for n in nodes:
+            chain = []
+            parent = n
+            while parent is not None:
+                chain.append((parent.type._name_, parent.value))
+                parent = by_id.get(parent.parent_id)
+            self.ancestors[n.id] = chain[::-1]
+
+        self.ranges = {}
+        for n in nodes:
+            self.ranges.setdefault((n.type._name_, n.value), (n.tree_id, n.left, n.right))
+
+        self._nodes = [(n.id, n.tree_id, n.left, n.right) for n in nodes]
+
+        children = {}
+        for n in sorted(nodes, key=lambda n: n.left):
+            children.setdefault(n.parent_id, []).append(n)
+
+        def to_json(n):
+            json_ = {"id": n.id, "type": n.type.name, "value": n.value}
+            if n.id in children:
+                json_["children"] = [to_json(c) for c in children[n.id]]
+            return json_
+
+        self.drilldown = [
+            to_json(n) for n in sorted(children.get(None, []), key=lambda n: n.tree_id)
+        ]
+
+    def descendants(self, type_: str, value: str) -> list:
+        """
+        Ids of property with given type and value and all its descendants,
+        None if no such property exists.
+        """
+
+        if (type_, value) not in self.ranges:
+            return None
+
+        tree_id, left, right = self.ranges[(type_, value)]
+        return [
+            id
+            for id, tree_id_, left_, right_ in self._nodes
+            if tree_id_ == tree_id and left_ >= left and right_ <= right
+        ]
+
+
+class CompoundPropertyCache:
+    """
+    Per-process snapshot of the compound property tree.
+
+    The snapshot is reloaded lazily when the version stamp stored in
+    database differs from the one it was built with. Writers of compound
+    properties must call invalidate.
+    """
+
+    name = "compound_property"
+
+    def __init__(self, db=None):
+        self.db = db
+        self._lock = threading.Lock()
+
+    @property
+    def _state(self):
+        return current_app.extensions.setdefault(
+            self.name + "_cache", {"snapshot": None, "version": None}
+        )
+
+    def get(self) -> PropertySnapshot:
+        from .models import CompoundProperty
+
+        state = self._state
+        version = get_version(self.db, self.name)
+        if state["snapshot"] is None or state["version"] != version:
+            with self._lock:
+                nodes = self.db.session.query(CompoundProperty).all()
+                state["snapshot"] = PropertySnapshot(nodes)
+                state["version"] = version
+
+        return state["snapshot"]
+
+    def invalidate(self):
+        """Bump version stamp and drop local snapshot"""
+
+        bump_version(self.db, self.name)
+        self._state["snapshot"] = None
+
+
+class ItemCountCache:
+    """
+    Counts of item queries, following one of the modes:
+
+    exact: COUNT of the query
+    cached: exact count kept per process for a normalized filter set, until
+        the version stamp is bumped by writers of items (ingestion, sections,
+        tags, ...), which must call invalidate. The stamp is bumped in a short
+        transaction of its own once the writer commits, so that writers do
+        not wait for each other's lock on it
+    estimated: row estimate of the query plan, from table statistics.
+        Only on PostgreSQL, exact otherwise
+    """
+
+    name = "item_count"
+    modes = ("exact", "cached", "estimated")
+
+    def __init__(self, db=None):
+        self.db = db
+        self._lock = threading.Lock()
+
+    @property
+    def _state(self):
+        return current_app.extensions.setdefault(
+            self.name + "_cache", {"counts": OrderedDict(), "version": None}
+        )
+
+    def count(self, items, key: str, mode: str):
+        """
+        Count of query items and the mode actually used.
+        key: normalized filters of items, identifies cached counts
+        """
+
+        if mode == "estimated":
+            n_items = self.estimate(items)
+            if n_items is not None:
+                return n_items, mode
+            mode = "exact"
+
+        if mode == "cached":
+            return self.cached(items, key), mode
+        return items.order_by(None).count(), "exact"
+
+    def cached(self, items, key: str) -> int:
+        state = self._state
+        version = get_version(self.db, self.name)
+        with self._lock:
+            if state["version"] != version:
+                state["counts"].clear()
+                state["version"] = version
+            n_items = state["counts"].get(key)
+            if n_items is not None:
+                state["counts"].move_to_end(key)
+                return n_items
+
+        n_items = items.order_by(None).count()
+        max_size = current_app.config["ITEMS_COUNT_CACHE_SIZE"]
+        with self._lock:
+            # skip counts that may predate an invalidation
+            if state["version"] == version:
+                state["counts"][key] = n_items
+                while len(state["counts"]) > max_size:
+                    state["counts"].popitem(last=False)
+        return n_items
+
+    def estimate(self, items):
+        """Planner estimate of the number of rows of items, None if unavailable"""
+
+        if "postgre" not in str(self.db.engine.url):
+            return None
+
+        statement = items.order_by(None).statement
+        plan = self.db.session.execute(Explain(statement)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def invalidate(self):
+        """Drop local counts, bump version stamp once the session is committed"""
+
+        engine = self.db.engine
+
+        def bump():
+            try:
+                with Session(engine) as session:
+                    bump_version(self.db, self.name, session)
+                    session.commit()
+            except Exception:
+                current_app.logger.exception("Invalidating cached item counts failed")
+
+        after_commit(self.db.session(), self.name, bump)
+        with self._lock:
+            self._state["counts"].clear()
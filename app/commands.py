@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import click
+from flask.cli import AppGroup
+
+item_meta_cli = AppGroup("item-meta", help="Manage the denormalized item_meta table")
+
+
+@item_meta_cli.command("refresh")
+@click.option("--plate-id", default=None, help="Only refresh items of this plate")
+def refresh_item_meta_command(plate_id):
+    """Rebuild item_meta rows (all rows when no plate is given)"""
+
+    from app import db
+    from app.api.v1.item import refresh_item_meta
+
+    criteria = {} if plate_id is None else {"plate_id": plate_id}
+    refresh_item_meta(**criteria)
+    db.session.commit()
+
+
+thumbnails_cli = AppGroup("thumbnails", help="Manage the thumbnail cache")
+
+
+@thumbnails_cli.command("warm")
+@click.option("--timepoint-id", default=None, help="Only items of this timepoint")
+@click.option("--plate-id", default=None, help="Only items of this plate")
+def warm_thumbnails_command(timepoint_id, plate_id):
+    """Compute thumbnails of items that are not cached yet"""
+
+    from app import db
+    from app import models as mdl
+    from app.extensions import thumbnails
+
+    criteria = {
+        k: v
+        for k, v in [("timepoint_id", timepoint_id), ("plate_id", plate_id)]
+        if v is not None
+    }
+    uris = db.session.query(mdl.Item.uri).filter_by(**criteria)
+    n_warmed = thumbnails.warm(uri for uri, in uris.yield_per(1000))
+    click.echo(f"Cached {n_warmed} thumbnails")
+
+
+@thumbnails_cli.command("clear")
+def clear_thumbnails_command():
+    """Remove all cached thumbnails"""
+
+    from app.extensions import thumbnails
+
+    thumbnails.clear()
+
+
+queries_cli = AppGroup("queries", help="Check plans of item queries")
+
+
+@queries_cli.command("explain")
+@click.option("--baseline", default=None, type=click.Path(exists=True),
+              help="JSON results of a previous run to compare with")
+@click.option("--save", default=None, type=click.Path(), help="Write results as JSON")
+@click.option("--tolerance", default=0.5, help="Allowed relative slowdown")
+def explain_queries_command(baseline, save, tolerance):
+    """
+    Run EXPLAIN ANALYZE on representative item queries, report their time,
+    the tables they scan in full, and regressions against a baseline
+    """
+
+    import json
+
+    from app import db
+    from app.query_plans import explain, find_regressions, representative_queries
+
+    results = {}
+    for name, query in representative_queries(db).items():
+        results[name] = explain(db, query)
+        scans = ", ".join(results[name]["scans"]) or "-"
+        click.echo(f"{name:12} {results[name]['time_ms']:10.1f}ms  scans: {scans}")
+
+    if save:
+        with open(save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = find_regressions(results, json.load(f), tolerance)
+        for message in regressions:
+            click.echo(f"Regression of {message}", err=True)
+        if regressions:
+            raise SystemExit(1)
+
+
+def register_commands(app):
+    app.cli.add_command(item_meta_cli)
+    app.cli.add_command(thumbnails_cli)
+    app.cli.add_command(queries_cli)
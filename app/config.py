@@ -29,8 +29,28 @@ class Config:
     OPENAPI_REDOC_PATH = "redoc"
 
     VIEWS_ITEMS_PER_PAGE = 20
+    # Count of items in paginated views: exact, cached or estimated
+    VIEWS_ITEMS_COUNT_MODE = "cached"
+    # Format of item images (png or webp) and their lifetime in browser caches
+    VIEWS_IMAGE_FORMAT = "webp"
+    VIEWS_IMAGE_MAX_AGE = 24 * 3600
+    # Size in pixels of a well in plate montages (default and largest allowed),
+    # their thumbnails are read in batch by the reader
+    VIEWS_MONTAGE_WELL_SIZE = 128
+    VIEWS_MONTAGE_MAX_WELL_SIZE = 512
+    # Prefetch thumbnails of other channels and next site of viewed items
+    VIEWS_PREFETCH_NEIGHBOURS = True
     API_ITEMS_PAGE_SIZE = 100
     API_ITEMS_MAX_PAGE_SIZE = 300
+    # Default count of items in listings (exact, cached or estimated),
+    # and number of filter sets whose counts are cached per process
+    API_ITEMS_COUNT_MODE = "exact"
+    ITEMS_COUNT_CACHE_SIZE = 1000
+    # Number of rows fetched at once when exporting items
+    API_ITEMS_EXPORT_CHUNK_SIZE = 10000
+
+    # Serve item listings from the denormalized item_meta table
+    ITEM_META_TABLE = False
 
     # Default regular expression for parsing files
     ADDITIONAL_REGEXP = {
@@ -54,6 +74,45 @@ class Config:
 
     PARSER_SUPPORTED_SCHEMES = ['s3']
 
+    # Number of items inserted at once when ingesting a timepoint
+    INGEST_BATCH_SIZE = 10000
+    # Number of background threads (per process) that ingest timepoints,
+    # 0 to ingest within the request
+    INGEST_WORKERS = 2
+
+    # Number of threads that list partitions of a S3 location concurrently
+    S3_LIST_WORKERS = 8
+    # Number of threads that download and of processes that decode images
+    # read in batches (0 processes to decode on the downloading threads)
+    S3_READ_WORKERS = 8
+    S3_DECODE_WORKERS = 2
+    # Shared S3 client: size of its connection pool (at least the number of
+    # threads that read at once), retries and TCP keep-alive
+    S3_MAX_POOL_CONNECTIONS = 32
+    S3_MAX_ATTEMPTS = 5
+    S3_RETRY_MODE = "standard"
+    S3_TCP_KEEPALIVE = True
+
+    # Thumbnails of item images, kept in memory (per process) and on disk
+    # (shared, disabled when no directory is set)
+    THUMBNAIL_CACHE_DIR = config("THUMBNAIL_CACHE_DIR", default="/tmp/paidb-thumbnails")
+    THUMBNAIL_CACHE_DISK_BYTES = 10 * 2**30
+    THUMBNAIL_CACHE_MEMORY_BYTES = 256 * 2**20
+    # Compute thumbnails of new items when ingesting a timepoint
+    THUMBNAILS_ON_INGEST = False
+    # Threads that prefetch thumbnails of items neighbouring a viewed item,
+    # and maximum number of thumbnails being prefetched at once
+    THUMBNAIL_PREFETCH_WORKERS = 2
+    THUMBNAIL_PREFETCH_MAX_PENDING = 8
+    # Seconds the key of a thumbnail (ETag of its file) is reused without
+    # looking it up again: overwritten files are seen after that delay
+    THUMBNAIL_KEY_TTL = 60
+
+    # Deep-zoom pyramids of item images, decoded once and kept on disk
+    TILE_CACHE_DIR = config("TILE_CACHE_DIR", default="/tmp/paidb-tiles")
+    TILE_CACHE_DISK_BYTES = 20 * 2**30
+    TILE_SIZE = 256
+
     @property
     def SQLALCHEMY_DATABASE_URI(self):
         return "postgresql+psycopg2://{}:{}@{}/{}".format(
@@ -71,6 +130,9 @@ class ConfigTest(Config):
     API_ITEMS_PAGE_SIZE = 10000
     API_ITEMS_MAX_PAGE_SIZE = 10000
     PARSER_SUPPORTED_SCHEMES = ['scheme']
+    # in-memory database is not shared between threads
+    INGEST_WORKERS = 0
+    THUMBNAIL_CACHE_DIR = None
 
 
 default = Config()
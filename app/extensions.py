@@ -7,7 +7,11 @@ from flask_migrate import Migrate
 from flask_smorest import Api
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy_mptt import mptt_sessionmaker
+from app.cache import CompoundPropertyCache, ItemCountCache
+from app.jobs import JobRunner
 from app.parser import FlaskParser
+from app.thumbnails import ThumbnailCache
+from app.tiles import TileCache
 
 # subclass the db manager and insert the wrapper at session creation
 class MPTTSQLAlchemy(SQLAlchemy):
@@ -28,3 +32,8 @@ bootstrap = Bootstrap5()
 restapi = Api()
 pages = FlatPages()
 ma = Marshmallow()
+property_cache = CompoundPropertyCache(db)
+item_counts = ItemCountCache(db)
+jobs = JobRunner(db)
+thumbnails = ThumbnailCache()
+tiles = TileCache()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+import csv
+import io
+import uuid
+from itertools import islice
+from typing import Callable, Iterable, Union
+
+from flask import current_app
+
+from .extensions import db
+
+ITEM_COLUMNS = ["id", "uri", "row", "col", "site", "chan", "plate_id", "timepoint_id"]
+
+
+def _batches(records, batch_size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _copy_batch(rows):
+    """Insert rows with COPY FROM STDIN (PostgreSQL)"""
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([[r.get(c) for c in ITEM_COLUMNS] for r in rows])
+    buffer.seek(0)
+
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        "COPY item ({}) FROM STDIN WITH (FORMAT csv)".format(
+            ", ".join(f'"{c}"' for c in ITEM_COLUMNS)
+        ),
+        buffer,
+    )
+
+
+def _executemany_batch(rows):
+    from .models import Item
+
+    db.session.execute(Item.__table__.insert(), rows)
+
+
+def log_progress(n_items: int):
+    current_app.logger.info(f"Inserted {n_items} items")
+
+
+def insert_items(
+    records: Iterable[dict],
+    plate_id,
+    timepoint_id,
+    batch_size: Union[int, None] = None,
+    progress: Callable[[int], None] = log_progress,
+) -> int:
+    """Insert parsed records as items of a timepoint, by batches.
+
+    Bypasses the ORM: uses COPY on PostgreSQL and executemany otherwise.
+    Nothing is committed, so that the caller controls the transaction.
+
+    Parameters
+    ----------
+    records : Iterable[dict]
+        Records with fields uri, row, col, site, chan, as yielded by the parser
+    plate_id, timepoint_id :
+        Parents of items
+    batch_size : int
+        Number of records inserted at once, defaults to INGEST_BATCH_SIZE
+    progress : Callable[[int], None]
+        Called with total number of inserted items after each batch
+
+    Returns
+    -------
+    int
+        Number of inserted items.
+
+    """
+
+    if batch_size is None:
+        batch_size = current_app.config["INGEST_BATCH_SIZE"]
+
+    insert_batch = _copy_batch if "postgre" in str(db.engine.url) else _executemany_batch
+
+    n_items = 0
+    for batch in _batches(records, batch_size):
+        rows = [
+            {"id": uuid.uuid4(), "plate_id": plate_id, "timepoint_id": timepoint_id, **r}
+            for r in batch
+        ]
+        insert_batch(rows)
+        n_items += len(rows)
+        progress(n_items)
+
+    return n_items
+
+
+def _set_missing(timepoint_id, uris, missing: bool, batch_size: int = 500):
+    from .models import Item
+
+    for batch in _batches(sorted(uris), batch_size):
+        db.session.query(Item).filter(
+            Item.timepoint_id == timepoint_id, Item.uri.in_(batch)
+        ).update({Item.missing: missing}, synchronize_session=False)
+
+
+def sync_items(
+    records: Iterable[dict],
+    timepoint,
+    full: bool = True,
+    batch_size: Union[int, None] = None,
+    progress: Callable[[int], None] = log_progress,
+) -> dict:
+    """Synchronize items of a timepoint with a new listing of its URI.
+
+    Records whose URI is not yet an item are inserted. On a full listing,
+    items whose URI was not listed are flagged as missing, and missing items
+    listed again are restored. An incremental listing (records after
+    timepoint.last_key) can only add items.
+    Updates timepoint.last_key, nothing is committed.
+
+    Parameters
+    ----------
+    records : Iterable[dict]
+        Records with fields uri, row, col, site, chan, as yielded by the parser
+    timepoint : TimePoint
+        Timepoint to synchronize
+    full : bool
+        Whether records are a complete listing of the timepoint URI
+    batch_size, progress :
+        Passed to insert_items
+
+    Returns
+    -------
+    dict
+        Number of new, missing and restored items.
+
+    """
+
+    from .models import Item
+
+    existing = dict(
+        db.session.query(Item.uri, Item.missing).filter(
+            Item.timepoint_id == timepoint.id
+        )
+    )
+    listed = set()
+
+    def new_records():
+        for record in records:
+            uri = record["uri"]
+            listed.add(uri)
+            if timepoint.last_key is None or uri > timepoint.last_key:
+                timepoint.last_key = uri
+            if uri not in existing:
+                yield record
+
+    n_new = insert_items(
+        new_records(), timepoint.plate_id, timepoint.id, batch_size, progress
+    )
+
+    missing, restored = set(), set()
+    if full:
+        missing = {u for u, m in existing.items() if not m and u not in listed}
+        restored = {u for u, m in existing.items() if m and u in listed}
+        _set_missing(timepoint.id, missing, True)
+        _set_missing(timepoint.id, restored, False)
+
+    return {"new": n_new, "missing": len(missing), "restored": len(restored)}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from .exceptions import MyException
+
+
+class JobRunner:
+    """Run jobs on a pool of background threads of the current process.
+
+    State of jobs is stored in table job, so that any worker process can
+    report it. With zero workers (config INGEST_WORKERS), jobs run inline.
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self.executor = None
+
+    def init_app(self, app):
+        self.app = app
+        self.n_workers = app.config["INGEST_WORKERS"]
+
+    def submit(self, job, fn, *args):
+        """Run fn(job, progress, *args) for job, and record its outcome.
+
+        progress is a callable that records the number of processed items
+        while fn is running. It updates the job row in a transaction of its
+        own: fn must not modify job before its last call to progress, or the
+        job transaction would hold the lock of the row progress waits for.
+        fn may return a callable, called once the job is committed, for work
+        that must not keep the job transaction open. Its failures are logged.
+        """
+
+        if self.n_workers == 0:
+            self._run(job.id, fn, *args)
+            return
+
+        # executor is created lazily, i.e. in forked worker processes
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.n_workers, thread_name_prefix="job"
+            )
+        self.executor.submit(self._run_in_app, job.id, fn, *args)
+
+    def _run_in_app(self, job_id, fn, *args):
+        with self.app.app_context():
+            try:
+                self._run(job_id, fn, *args)
+            finally:
+                # a failed job must not leave its session to the next one
+                self.db.session.remove()
+
+    def _progress(self, job_id):
+        from .models import Job
+
+        def progress(n_items):
+            # job runs in a transaction of its own, use another one for progress
+            with Session(self.db.engine) as session:
+                session.query(Job).filter_by(id=job_id).update({"n_items": n_items})
+                session.commit()
+
+        # sqlite has a single writer: the job transaction
+        if self.n_workers == 0 or "sqlite" in str(self.db.engine.url):
+            return lambda n_items: None
+        return progress
+
+    def _run(self, job_id, fn, *args):
+        from .models import Job, JobStatus
+
+        job = self.db.session.get(Job, job_id)
+        job.status = JobStatus.running
+        job.started = datetime.now(timezone.utc)
+        self.db.session.commit()
+
+        follow_up = None
+        try:
+            follow_up = fn(job, self._progress(job_id), *args)
+            job.status = JobStatus.done
+        except Exception as e:
+            self.db.session.rollback()
+            self.app.logger.exception(f"Job {job_id} failed")
+            job = self.db.session.get(Job, job_id)
+            job.status = JobStatus.failed
+            job.error = e.message if isinstance(e, MyException) else repr(e)
+
+        job.finished = datetime.now(timezone.utc)
+        self.db.session.commit()
+
+        if callable(follow_up):
+            try:
+                follow_up()
+            except Exception:
+                self.app.logger.exception(f"Follow-up of job {job_id} failed")
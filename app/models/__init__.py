@@ -1,9 +1,12 @@
 from app.extensions import db
 from sqlalchemy.ext.associationproxy import association_proxy
 
+from .cache_version import CacheVersion
 from .cell import Cell
 from .compound import Compound, CompoundProperty, CompoundPropertyType
 from .item import Item, Tag, ItemTagAssociation
+from .item_meta import ItemMeta
+from .job import Job, JobStatus
 from .modality import Modality
 from .plate import Plate
 from .section import Section
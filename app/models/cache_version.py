@@ -0,0 +1,16 @@
+from app.extensions import db
+
+
+class CacheVersion(db.Model):
+    """
+    Version stamps of cached resources, shared between worker processes.
+    A writer bumps the version of a resource so that readers know their
+    in-memory copy is stale.
+    """
+
+    __tablename__ = "cache_version"
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}: {self.version}>"
@@ -1,6 +1,7 @@
 import uuid
 
 from app.extensions import db, ma
+from sqlalchemy import false
 from sqlalchemy_utils.types.uuid import UUIDType
 from .mixins import UpdateMixin
 
@@ -10,6 +11,15 @@ class Item(db.Model, UpdateMixin):
     """
 
     __tablename__ = "item"
+    __table_args__ = (
+        # filters of item listings, from the most to the least selective prefix
+        db.Index(
+            "ix_item_plate_timepoint_chan_well",
+            "plate_id", "timepoint_id", "chan", "row", "col", "site",
+        ),
+        # files of a timepoint, diffed when it is synced
+        db.Index("ix_item_timepoint_uri", "timepoint_id", "uri"),
+    )
     id = db.Column(UUIDType, primary_key=True, default=uuid.uuid4, index=True)
     uri = db.Column(db.String(300))
     row = db.Column(db.String(1))
@@ -18,6 +28,8 @@ class Item(db.Model, UpdateMixin):
     chan = db.Column(db.Integer)
     plate_id = db.Column(db.ForeignKey("plate.id"))
     timepoint_id = db.Column(db.ForeignKey("timepoint.id"))
+    # file was not found when re-scanning the timepoint
+    missing = db.Column(db.Boolean, nullable=False, default=False, server_default=false())
 
 
 
@@ -0,0 +1,52 @@
+from app.extensions import db
+from sqlalchemy_utils.types.uuid import UUIDType
+
+
+class ItemMeta(db.Model):
+    """
+    Denormalized meta-data of items, one row per item.
+
+    Mirrors the columns returned by the item/plate/section/... join so that
+    item listings can be served from a single table.
+    Rows are refreshed whenever one of the joined resources changes.
+    """
+
+    __tablename__ = "item_meta"
+    __table_args__ = (
+        # order of item listings
+        db.Index(
+            "ix_item_meta_listing_order",
+            "timepoint_time", "row", "col", "site", "chan", "id",
+        ),
+        db.Index(
+            "ix_item_meta_plate_timepoint_chan", "plate_id", "timepoint_id", "chan"
+        ),
+    )
+    id = db.Column(UUIDType, primary_key=True, index=True)
+    uri = db.Column(db.String(300))
+    row = db.Column(db.String(1))
+    col = db.Column(db.Integer)
+    site = db.Column(db.Integer)
+    chan = db.Column(db.Integer)
+    missing = db.Column(db.Boolean)
+    plate_id = db.Column(UUIDType, index=True)
+    plate_name = db.Column(db.String(100))
+    cell_id = db.Column(UUIDType, index=True)
+    cell_name = db.Column(db.String(100))
+    cell_code = db.Column(db.String(100))
+    stack_id = db.Column(UUIDType, index=True)
+    stack = db.Column(db.String(100))
+    modality_id = db.Column(UUIDType, index=True)
+    modality_name = db.Column(db.String(100))
+    modality_target = db.Column(db.String(100))
+    compound_concentration = db.Column(db.Float)
+    compound_id = db.Column(UUIDType, index=True)
+    compound_name = db.Column(db.String(100))
+    compound_property_id = db.Column(db.Integer, index=True)
+    timepoint_time = db.Column(db.DateTime(timezone=True))
+    timepoint_id = db.Column(UUIDType, index=True)
+    section_id = db.Column(UUIDType, index=True)
+    tags = db.Column(db.Text())
+
+    def __repr__(self):
+        return f"<ItemMeta {self.id}>"
@@ -0,0 +1,34 @@
+import enum
+import uuid
+
+from app.extensions import db
+from sqlalchemy import Enum, func
+from sqlalchemy_utils.types.uuid import UUIDType
+
+
+class JobStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class Job(db.Model):
+    """
+    Background task, e.g. ingestion of the items of a timepoint
+    """
+
+    __tablename__ = "job"
+    id = db.Column(UUIDType, primary_key=True, default=uuid.uuid4, index=True)
+    status = db.Column(Enum(JobStatus), nullable=False, default=JobStatus.pending)
+    uri = db.Column(db.String(300))
+    plate_id = db.Column(UUIDType)
+    timepoint_id = db.Column(UUIDType)
+    n_items = db.Column(db.Integer, nullable=False, default=0)
+    created = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    started = db.Column(db.DateTime(timezone=True))
+    finished = db.Column(db.DateTime(timezone=True))
+    error = db.Column(db.Text())
+
+    def __repr__(self):
+        return f"<Job {self.id} ({self.status.name})>"
@@ -15,6 +15,13 @@ class Section(db.Model):
     """
 
     __tablename__ = "section"
+    # sections are joined by plate, with range predicates on wells
+    __table_args__ = (
+        db.Index(
+            "ix_section_plate_wells",
+            "plate_id", "row_start", "row_end", "col_start", "col_end",
+        ),
+    )
     id = db.Column(UUIDType, primary_key=True, default=uuid.uuid4, index=True)
 
     col_start = db.Column(db.Integer)
@@ -11,6 +11,8 @@ class TimePoint(db.Model):
     time = db.Column(db.DateTime(timezone=True), server_default=func.now())
     uri = db.Column(db.String(300))
     plate_id = db.Column(db.ForeignKey("plate.id"))
+    # greatest URI listed so far, re-scans can start after it
+    last_key = db.Column(db.String(300))
 
     def __repr__(self):
         return f"<TimePoint {self.uri} ({self.id})>"
@@ -1,20 +1,26 @@
+
 from marshmallow import ValidationError
 from urllib.parse import urlparse
 
 
-def _concat_properties(
+def _concat_properties_many(
         db, property_model, data, prefix="compound_", id_field="compound_property_id", **kwargs
 ):
-    # get properties of all ancestors
-    properties = (
-        db.session.get(property_model, data[id_field])
-        .path_to_root()
-        .all()
-    )
-    properties = [(p.type._name_, p.value) for p in properties]
+    from app.extensions import property_cache
+
+    # get properties of all ancestors from in-memory tree
+    ancestors = property_cache.get().ancestors
 
     # convert to dict and concatenate prefix
-    properties = {prefix + f"{p[0]}": p[1] for p in properties}
+    return [
+        {**d, **{prefix + f"{t}": v for t, v in ancestors.get(d.get(id_field), [])}}
+        for d in data
+    ]
+
 
-    data = {**data, **properties}
-    return data
+def _concat_properties(
+        db, property_model, data, prefix="compound_", id_field="compound_property_id", **kwargs
+):
+    return _concat_properties_many(
+        db, property_model, [data], prefix=prefix, id_field=id_field, **kwargs
+    )[0]
@@ -1,9 +1,106 @@
+import functools
 import re
-from typing import Union
+from typing import Iterator, Union
 
 from .reader.base import BaseReader
 
 
+class CompiledPatterns:
+    """All regular expressions of a parser combined into a single pattern.
+
+    Each expression is wrapped in an optional lookahead anchored at the start
+    of the URI, so that one call to match tells whether the URI is ignored,
+    valid, and captures all additional fields at once.
+    """
+
+    def __init__(
+        self,
+        additional_rex: tuple[tuple[str, str], ...] = (),
+        ignore_rex: str = "$^",
+        valid_rex: str = ".*",
+    ):
+        # ignore and valid expressions are matched at start (re.match),
+        # additional expressions are searched (re.search)
+        parts = [f"(?:(?=({ignore_rex}))|)", f"(?:(?=({valid_rex}))|)"]
+        # groups of each expression shift the indexes of the next ones
+        self.ignore_group = 1
+        self.valid_group = 2 + re.compile(ignore_rex).groups
+        n_groups = self.valid_group + re.compile(valid_rex).groups
+        self.fields = []
+        for k, v in additional_rex:
+            parts.append(f"(?:(?=.*?(?:{v}))|)")
+            # first group of expression holds the value
+            self.fields.append((k, n_groups + 1))
+            n_groups += re.compile(v).groups
+
+        self.pattern = re.compile("".join(parts))
+
+    def __call__(self, uri: str) -> Union[dict, None]:
+        """Record with URI and additional fields, None if URI must be skipped"""
+
+        m = self.pattern.match(uri)
+        if m.group(self.ignore_group) is not None or m.group(self.valid_group) is None:
+            return None
+
+        record = {"uri": uri}
+        for k, group in self.fields:
+            record[k] = m.group(group)
+        return record
+
+
+class SeparatePatterns:
+    """Regular expressions of a parser matched one by one.
+
+    Used for expressions that cannot be combined into a single pattern,
+    same interface as CompiledPatterns.
+    """
+
+    def __init__(
+        self,
+        additional_rex: tuple[tuple[str, str], ...] = (),
+        ignore_rex: str = "$^",
+        valid_rex: str = ".*",
+    ):
+        self.ignore = re.compile(ignore_rex)
+        self.valid = re.compile(valid_rex)
+        self.fields = [(k, re.compile(v)) for k, v in additional_rex]
+
+    def __call__(self, uri: str) -> Union[dict, None]:
+        """Record with URI and additional fields, None if URI must be skipped"""
+
+        if self.ignore.match(uri) or not self.valid.match(uri):
+            return None
+
+        record = {"uri": uri}
+        for k, rex in self.fields:
+            m = rex.search(uri)
+            record[k] = m.group(1) if m else None
+        return record
+
+
+# constructs that change meaning once an expression is embedded in another:
+# backreferences and conditionals by group number, global inline flags
+NOT_COMBINABLE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d+\)|\(\?[aiLmsux]+\)")
+
+
+@functools.lru_cache(maxsize=16)
+def compile_patterns(
+    additional_rex, ignore_rex, valid_rex
+) -> Union[CompiledPatterns, SeparatePatterns]:
+    """
+    Patterns combined into one when possible, matched one by one otherwise
+    (see NOT_COMBINABLE, or e.g. a group name used by several expressions)
+    """
+
+    expressions = [ignore_rex, valid_rex, *(v for _, v in additional_rex)]
+    if not any(NOT_COMBINABLE.search(rex) for rex in expressions):
+        try:
+            return CompiledPatterns(additional_rex, ignore_rex, valid_rex)
+        except re.error:
+            pass
+    return SeparatePatterns(additional_rex, ignore_rex, valid_rex)
+
+
 class Parser:
 
     def __init__(self, reader: BaseReader):
@@ -19,16 +116,16 @@ class Parser:
 
         self.reader = reader
 
-
-    def __call__(
+    def iter(
         self,
         base_uri: str,
         additional_rex: Union[dict[str, str], None] = None,
         ignore_rex: str = "$^",
         valid_rex: str = ".*",
+        start_after: Union[str, None] = None,
         **kwargs
-    ) -> list[dict]:
-        """Run parsing.
+    ) -> Iterator[dict]:
+        """Run parsing, yield items as files are listed.
 
         Parameters
         ----------
@@ -40,38 +137,42 @@ class Parser:
             Match files to ignore.
         valid_rex : str
             Match files to include.
+        start_after : Union[str, None]
+            Only parse files whose URI comes after this one.
 
         Returns
         -------
-        list[dict]
-            List of items.
+        Iterator[dict]
+            Items, with fields uri and additional fields (None when not matched).
 
         """
 
-        uris = self.reader.list(base_uri)
-        items = [{"uri": uri} for uri in uris]
+        additional_rex = tuple((additional_rex or {}).items())
+        patterns = compile_patterns(additional_rex, ignore_rex, valid_rex)
 
-        items = [
-            {"uri": uri}
-            for uri in uris
-            if not re.compile(ignore_rex).match(uri)
-            and re.compile(valid_rex).match(uri)
-        ]
+        uris = (
+            self.reader.list(base_uri)
+            if start_after is None
+            else self.reader.list(base_uri, start_after=start_after)
+        )
+        for uri in uris:
+            record = patterns(uri)
+            if record is not None:
+                yield record
+
+    def __call__(self, base_uri: str, **kwargs) -> list[dict]:
+        """Run parsing.
 
-        # perform regexp search on URI field using all expression and concatenate to
-        # results
-        if additional_rex is not None:
-            for k, v in additional_rex.items():
-                rex = re.compile(v)
-                # find match on each URI
-                matches = [rex.search(item["uri"]) for item in items]
-                # append if there was a match
-                items = [
-                    {**r, k: match_.group(1) if matches else None}
-                    for r, match_ in zip(items, matches)
-                ]
+        Same parameters as iter.
 
-        return items
+        Returns
+        -------
+        list[dict]
+            List of items.
+
+        """
+
+        return list(self.iter(base_uri, **kwargs))
 
 
 class FlaskParser(Parser):
@@ -99,16 +200,17 @@ class FlaskParser(Parser):
             "additional_rex": app.config["ADDITIONAL_REGEXP"],
         }
 
-    def __call__(self, base_uri: Union[str, list[str]], **kwargs):
-
-        from .models import Item
+    def iter(self, base_uri: Union[str, list[str]], start_after=None) -> Iterator[dict]:
+        """Yield records of all items at URI(s)"""
 
         if isinstance(base_uri, str):
             base_uri = [base_uri]
 
-        items = []
         for uri in base_uri:
-            items_ = self._parser(uri, **self.parser_args)
-            items += [Item(**i, **kwargs) for i in items_]
+            yield from self._parser.iter(uri, start_after=start_after, **self.parser_args)
+
+    def __call__(self, base_uri: Union[str, list[str]], **kwargs):
+
+        from .models import Item
 
-        return items
+        return [Item(**i, **kwargs) for i in self.iter(base_uri)]
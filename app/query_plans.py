@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import json
+import re
+import time
+
+from flask import current_app
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN of a statement: plan as JSON on PostgreSQL, executed when
+    analyze is set, and rows of EXPLAIN QUERY PLAN on SQLite
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+def _compile_statement(element, compiler, **kw):
+    sql = compiler.process(element.statement, **kw)
+    # rows are the plan, not the columns of the statement: do not convert them
+    compiler._result_columns = []
+    return sql
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain_postgresql(element, compiler, **kw):
+    options = "ANALYZE, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) " + _compile_statement(element, compiler, **kw)
+
+
+@compiles(Explain, "sqlite")
+def _compile_explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + _compile_statement(element, compiler, **kw)
+
+
+def representative_queries(db) -> dict:
+    """
+    First pages of item listings with the usual filters, on values taken
+    from the first item of the database. Empty if there are no items.
+    """
+
+    from . import models as mdl
+    from .api.v1.item import apply_query_args, filter_columns, get_items_with_meta
+
+    item = db.session.query(mdl.Item).order_by(mdl.Item.plate_id).first()
+    if item is None:
+        return {}
+
+    page_size = current_app.config["API_ITEMS_PAGE_SIZE"]
+    columns = filter_columns(current_app.config["ITEM_META_TABLE"])
+
+    def items(**args):
+        return apply_query_args(db, get_items_with_meta(), args)
+
+    plate = {"plate_id": item.plate_id}
+    timepoint = {**plate, "timepoint_id": item.timepoint_id}
+    queries = {
+        "all": items(),
+        "plate": items(**plate),
+        "timepoint": items(**timepoint),
+        "channel": items(**timepoint, chan=item.chan),
+        "wells": items(**plate).filter(
+            columns["row"].between("A", item.row),
+            columns["col"].between(1, item.col),
+        ),
+    }
+    return {name: query.limit(page_size) for name, query in queries.items()}
+
+
+def _seq_scans(node):
+    if node.get("Node Type") == "Seq Scan":
+        yield node["Relation Name"]
+    for child in node.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+def explain(db, query) -> dict:
+    """
+    Execution time (in ms) of query, and the tables it reads in full (scans)
+    """
+
+    statement = query.statement
+    if "postgre" in str(db.engine.url):
+        plan = db.session.execute(Explain(statement, analyze=True)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return {
+            "time_ms": plan[0]["Execution Time"],
+            "scans": sorted(set(_seq_scans(plan[0]["Plan"]))),
+        }
+
+    details = [row[-1] for row in db.session.execute(Explain(statement))]
+    start = time.perf_counter()
+    query.all()
+    return {
+        "time_ms": 1000 * (time.perf_counter() - start),
+        "scans": sorted(
+            {m.group(1) for m in (re.match(r"SCAN (\w+)", d) for d in details) if m}
+        ),
+    }
+
+
+def find_regressions(
+    results: dict, baseline: dict, tolerance: float = 0.5, min_ms: float = 5.0
+) -> list:
+    """
+    Messages about queries of results slower than in baseline by more than
+    a fraction tolerance (and min_ms), or that read more tables in full
+    """
+
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+
+        limit = max(before["time_ms"] * (1 + tolerance), before["time_ms"] + min_ms)
+        if result["time_ms"] > limit:
+            regressions.append(
+                f"{name}: {result['time_ms']:.1f}ms, was {before['time_ms']:.1f}ms"
+            )
+        scans = sorted(set(result["scans"]) - set(before["scans"]))
+        if scans:
+            regressions.append(f"{name}: now scans {', '.join(scans)}")
+
+    return regressions
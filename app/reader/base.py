@@ -3,6 +3,69 @@ from abc import ABC, abstractmethod
 from urllib.parse import urlparse
 from app.exceptions import ParsingException
 import functools
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Callable, Iterable, Iterator, Union
+
+
+def read_concurrently(
+    uris: Iterable[str],
+    fetch: Callable,
+    threads: Executor,
+    decode: Union[Callable, None] = None,
+    processes: Union[Executor, None] = None,
+    ordered: bool = True,
+    max_pending: int = 16,
+    return_exceptions: bool = False,
+) -> Iterator[tuple]:
+    """
+    Yield (uri, decode(fetch(uri))) for uris, fetched on threads
+    and decoded on processes (on the fetching thread if None).
+
+    At most max_pending uris are in flight: the next one is only submitted
+    when a result is consumed. Results come in input order if ordered,
+    in completion order otherwise. With return_exceptions, a uri that fails
+    gives its exception instead of raising it.
+    """
+
+    def read(uri):
+        data = fetch(uri)
+        if decode is None:
+            return data
+        if processes is None:
+            return decode(data)
+        return processes.submit(decode, data).result()
+
+    uris = iter(uris)
+    pending = deque()
+
+    def submit_next():
+        for uri in uris:
+            future = threads.submit(read, uri)
+            future.uri = uri
+            pending.append(future)
+            return
+
+    try:
+        for _ in range(max_pending):
+            submit_next()
+
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+            if return_exceptions and future.exception() is not None:
+                yield future.uri, future.exception()
+            else:
+                yield future.uri, future.result()
+            submit_next()
+    finally:
+        # consumer stopped early or failed
+        for future in pending:
+            future.cancel()
 
 class BaseReader:
 
@@ -11,5 +74,43 @@ class BaseReader:
         pass
 
     @abstractmethod
-    def list(self, uri) -> list[str]:
+    def list(self, uri, start_after=None) -> Iterable[str]:
         pass
+
+    def read(self, uri):
+        """Content of file at full resolution, defaults to __call__"""
+        return self(uri)
+
+    def read_many(
+        self, uris: Iterable[str], ordered: bool = True, return_exceptions: bool = False
+    ) -> Iterator[tuple]:
+        """
+        Yield (uri, content) for uris, as returned by __call__.
+        Results come in input order if ordered, in completion order otherwise.
+        With return_exceptions, a uri that fails gives its exception instead
+        of raising it. Defaults to reading one by one.
+        """
+        for uri in uris:
+            try:
+                content = self(uri)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                content = e
+            yield uri, content
+
+    def stats(self) -> dict:
+        """Usage counters of the reader"""
+        return {}
+
+    def etag(self, uri) -> Union[str, None]:
+        """Version tag of file content, None if unknown"""
+        return None
+
+    def etags(self, uris: Iterable[str]) -> Iterator[tuple]:
+        """
+        Yield (uri, etag) for uris, in input order.
+        Defaults to looking them up one by one.
+        """
+        for uri in uris:
+            yield uri, self.etag(uri)
@@ -1,79 +1,398 @@
 #!/usr/bin/env python3
+import functools
+import multiprocessing
+import queue
+import string
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from os.path import commonprefix
+from typing import Iterator, Union
 from urllib.parse import urlparse
 
 import boto3
 from aws_error_utils import get_aws_error_info
 from botocore.client import ClientError as BotoClientError
+from botocore.config import Config as BotoConfig
 
 from ..exceptions import DownloadException, ParsingException
-from .base import BaseReader
+from .base import BaseReader, read_concurrently
 
 from PIL import Image
 from io import BytesIO
 import numpy as np
 from skimage.transform import resize
 
-def get_bucket_client():
-    client = boto3.client("s3")
+# classes of characters used to split a key space into partitions listed
+# concurrently: a key character is followed by ones of its own class
+PARTITION_CHARS = (string.digits, string.ascii_uppercase, string.ascii_lowercase, "-._")
+
+
+def get_bucket_client(max_pool_connections=10, max_attempts=3, retry_mode="legacy",
+                      tcp_keepalive=False):
+    """
+    S3 client with a pool of keep-alive connections.
+    Clients are thread-safe, they should be created once and shared.
+    """
+
+    config = BotoConfig(
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": max_attempts, "mode": retry_mode},
+        tcp_keepalive=tcp_keepalive,
+    )
+    # a session per client: default session is not thread-safe
+    client = boto3.session.Session().client("s3", config=config)
 
     return client
 
 
-def get_pages(client, uri):
+class ConnectionStats:
+    """
+    Count requests sent by a client and connections it opened,
+    requests minus connections were sent on reused connections.
+
+    Requests are counted with a botocore event hook. Connections are read
+    from the urllib3 pools of the client, which botocore does not expose:
+    they are None when its internals are not as expected.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.n_requests = 0
+        self._lock = threading.Lock()
+        client.meta.events.register("before-send.s3", self._count_request)
+
+    def _count_request(self, **kwargs):
+        with self._lock:
+            self.n_requests += 1
+
+    def _n_connections(self) -> Union[int, None]:
+        # urllib3 pools of the client, one per host
+        try:
+            http_session = self.client._endpoint.http_session
+            managers = [http_session._manager, *http_session._proxy_managers.values()]
+            return sum(
+                manager.pools[key].num_connections
+                for manager in managers
+                for key in manager.pools.keys()
+            )
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+    def as_dict(self) -> dict:
+        n_connections = self._n_connections()
+        return {
+            "requests": self.n_requests,
+            "connections": n_connections,
+            "reused": None if n_connections is None else max(0, self.n_requests - n_connections),
+        }
+
+
+def get_pages(client, uri, page_size=1000, start_after=None):
     uri = urlparse(uri)
     paginator = client.get_paginator("list_objects_v2")
 
-    pages = paginator.paginate(Bucket=uri.netloc, Prefix=uri.path, Delimiter="/")
+    kwargs = {} if start_after is None else {"StartAfter": start_after}
+    pages = paginator.paginate(
+        Bucket=uri.netloc,
+        Prefix=uri.path[1:],
+        Delimiter="/",
+        PaginationConfig={"PageSize": page_size},
+        **kwargs
+    )
 
     return pages
 
 
+def make_partitions(first_keys, max_partitions=16, split_depth=3, stop_at=None):
+    """
+    Split key space that follows first_keys (sorted) into at most
+    max_partitions intervals.
+
+    Candidate boundaries are built from the last key, by replacing one of its
+    characters with each following character of the same class in
+    PARTITION_CHARS, e.g. "file_A13" gives "file_A14", ..., "file_A2", ...,
+    "file_B", ... The replaced characters are the split_depth ones that end
+    where first_keys start to differ, and the one after, so that listings
+    with names such as file_A01_... get boundaries over rows as well as
+    columns. Boundaries are spread evenly over the candidates, the key space
+    beyond them is unknown.
+
+    Returns list of (start_after, stop_at) tuples, where stop_at of the
+    last interval is the given one, None for the end of the key space.
+    """
+
+    last = first_keys[-1]
+    n_common = len(commonprefix([first_keys[0], last]))
+    boundaries = set()
+    for i in range(max(0, n_common - split_depth + 1), min(len(last), n_common + 2)):
+        for chars in PARTITION_CHARS:
+            if last[i] in chars:
+                boundaries.update(last[:i] + c for c in chars if c > last[i])
+    boundaries = sorted(b for b in boundaries if stop_at is None or b < stop_at)
+    n_boundaries = min(len(boundaries), max_partitions - 1)
+    boundaries = [last] + [
+        boundaries[i * len(boundaries) // n_boundaries] for i in range(n_boundaries)
+    ]
+
+    return list(zip(boundaries, boundaries[1:] + [stop_at]))
+
+
+def decode_image(data: bytes, size=None) -> np.ndarray:
+    """Decode image file content, resized to size (same dtype) if given"""
+
+    image = np.array(Image.open(BytesIO(data)))
+    if size is not None:
+        resized = resize(image, size, anti_aliasing=True, preserve_range=True)
+        # keep the source dtype, float64 thumbnails take 4 to 8 times the bytes
+        if np.issubdtype(image.dtype, np.integer):
+            resized = np.rint(resized)
+        image = resized.astype(image.dtype)
+    return image
+
+
 class S3Reader(BaseReader):
     """
     Class that lists and reads image files on S3
     """
 
-    def __init__(self, size=(512, 512)):
-        self.client = get_bucket_client()
+    def __init__(self, size=(512, 512), list_workers=8, list_page_size=1000,
+                 read_workers=8, decode_workers=0, **client_config):
+        """
+        read_workers: threads that download files in read_many
+        decode_workers: processes that decode and resize images in read_many,
+            0 to decode on the downloading threads
+        client_config: arguments of get_bucket_client, the client is shared
+            by all threads
+        """
+        self.client = get_bucket_client(**client_config)
+        self.connection_stats = ConnectionStats(self.client)
         self.size = size
+        self.list_workers = list_workers
+        self.list_page_size = list_page_size
+        self.read_workers = read_workers
+        self.decode_workers = decode_workers
+        self._executors = None
+        self._executors_lock = threading.Lock()
 
-    def __call__(self, uri) -> bytes:
+    def __call__(self, uri) -> np.ndarray:
+        """
+        Return image from bucket, resized to self.size
+
+        """
+        return decode_image(self.download(uri), self.size)
+
+    def read(self, uri) -> np.ndarray:
+        """
+        Return image from bucket at full resolution
+
+        """
+        return decode_image(self.download(uri))
+
+    def download(self, uri) -> bytes:
         """
         Return bytes from bucket
 
         """
         uri = urlparse(uri)
         bucket = uri.netloc
-        client = get_bucket_client()
 
         try:
-            body = client.get_object(Bucket=bucket, Key=uri.path[1:])["Body"]
-            image = Image.open(body)
-            image = np.array(image)
-            image = resize(image, self.size, anti_aliasing=True,
-                           preserve_range=True)
-            return image
+            return self.client.get_object(Bucket=bucket, Key=uri.path[1:])["Body"].read()
 
         except BotoClientError as e:
             e = get_aws_error_info(e)
             raise DownloadException(message=e.message, payload={'operation': e.operation_name})
 
+    @property
+    def executors(self):
+        """Thread pool that downloads and process pool that decodes, created once"""
 
+        with self._executors_lock:
+            if self._executors is None:
+                processes = None
+                if self.decode_workers > 0:
+                    # forking a multi-threaded process is unsafe
+                    processes = ProcessPoolExecutor(
+                        self.decode_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                self._executors = ThreadPoolExecutor(self.read_workers), processes
+        return self._executors
 
-    def list(self, uri) -> list[str]:
+    def read_many(self, uris, ordered=True, return_exceptions=False) -> Iterator[tuple]:
+        """
+        Yield (uri, image resized to self.size) for uris.
+        Downloads run concurrently on a pool of read_workers threads, decoding
+        on a pool of decode_workers processes, with at most twice as many
+        files in flight as threads.
+        Results come in input order if ordered, in completion order otherwise.
+        With return_exceptions, a uri that fails gives its exception.
+        """
+
+        threads, processes = self.executors
+        return read_concurrently(
+            uris,
+            self.download,
+            threads,
+            decode=functools.partial(decode_image, size=self.size),
+            processes=processes,
+            ordered=ordered,
+            max_pending=2 * self.read_workers,
+            return_exceptions=return_exceptions,
+        )
+
+    def stats(self) -> dict:
+        """Connection reuse counters of the S3 client"""
+        return self.connection_stats.as_dict()
+
+    def etag(self, uri) -> str:
+        """
+        ETag of object, changes when the object is overwritten
+        """
+        uri = urlparse(uri)
 
         try:
-            pages = get_pages(self.client, uri)
-
-            # gather all items at location excluding children nodes ("directories")
-            items = []
-            for p in pages:
-                if "Contents" in p.keys():
-                    for o in p["Contents"]:
-                        f = o["Key"]
-                        items.append(uri)
+            return self.client.head_object(Bucket=uri.netloc, Key=uri.path[1:])["ETag"]
         except BotoClientError as e:
             e = get_aws_error_info(e)
-            raise ParsingException(message=e.message, payload={'operation': e.operation_name})
+            raise DownloadException(message=e.message, payload={'operation': e.operation_name})
+
+    def etags(self, uris) -> Iterator[tuple]:
+        """
+        Yield (uri, ETag) for uris, in input order, looked up concurrently
+        on the pool of read_workers threads
+        """
+
+        threads, _ = self.executors
+        return read_concurrently(uris, self.etag, threads, max_pending=2 * self.read_workers)
+
+    def _list_pages(self, uri, start_after=None, stop_at=None):
+        """
+        Generate (keys, more) for pages of keys at location (excluding children
+        nodes, i.e. "directories") that come after start_after, up to and
+        including stop_at, where more tells whether keys are left to list
+        """
+
+        for p in get_pages(self.client, uri, self.list_page_size, start_after):
+            keys = [o["Key"] for o in p.get("Contents", [])]
+            if stop_at is not None and keys and keys[-1] > stop_at:
+                yield [k for k in keys if k <= stop_at], False
+                return
+            yield keys, p.get("IsTruncated", False)
+
+    def _list_keys(self, uri, start_after=None, stop_at=None):
+        """
+        Generate keys at location (excluding children nodes, i.e. "directories")
+        that come after start_after, up to and including stop_at
+        """
 
-        return items
+        for keys, _ in self._list_pages(uri, start_after, stop_at):
+            yield from keys
+
+    def _list_concurrent(self, uri, start_after=None):
+        bucket = urlparse(uri).netloc
+
+        # first page tells whether fanning out is worth it
+        pages = iter(get_pages(self.client, uri, self.list_page_size, start_after))
+        page = next(pages, {})
+        first_keys = [o["Key"] for o in page.get("Contents", [])]
+        for k in first_keys:
+            yield f"s3://{bucket}/{k}"
+        if not page.get("IsTruncated") or not first_keys:
+            return
+
+        # list partitions on a thread pool, hand keys over through a
+        # bounded queue so that slow consumers slow down producers
+        done = object()
+        stop = threading.Event()
+        keys = queue.Queue(maxsize=self.list_workers * self.list_page_size)
+        # a few partitions per worker, so that uneven ones balance out
+        max_partitions = 2 * self.list_workers
+        n_partitions = {"submitted": 0, "running": 0}
+        lock = threading.Lock()
+
+        def submit(partitions):
+            for start_after, stop_at in partitions:
+                executor.submit(list_partition, start_after, stop_at)
+
+        def split(page_keys, stop_at):
+            # boundaries are guesses: a partition bigger than a page is split
+            # again while fewer than max_partitions are running
+            with lock:
+                n_free = max_partitions - n_partitions["running"]
+                if n_free <= 0:
+                    return []
+                partitions = make_partitions(page_keys, n_free + 1, stop_at=stop_at)
+                if len(partitions) < 2:
+                    return []
+                n_partitions["submitted"] += len(partitions)
+                n_partitions["running"] += len(partitions)
+            return partitions
+
+        def list_partition(start_after, stop_at):
+            try:
+                for page_keys, more in self._list_pages(uri, start_after, stop_at):
+                    for k in page_keys:
+                        if stop.is_set():
+                            return
+                        keys.put(k)
+                    partitions = (
+                        split(page_keys, stop_at)
+                        if more and page_keys and not stop.is_set() else []
+                    )
+                    if partitions:
+                        submit(partitions)
+                        return
+            except Exception as e:
+                # connection errors too: a partition must not end silently
+                keys.put(e)
+            finally:
+                with lock:
+                    n_partitions["running"] -= 1
+                keys.put(done)
+
+        def n_submitted():
+            with lock:
+                return n_partitions["submitted"]
+
+        partitions = make_partitions(first_keys, max_partitions=max_partitions)
+        n_partitions["submitted"] = n_partitions["running"] = len(partitions)
+        n_done = 0
+        with ThreadPoolExecutor(max_workers=self.list_workers) as executor:
+            submit(partitions)
+
+            try:
+                while n_done < n_submitted():
+                    k = keys.get()
+                    if k is done:
+                        n_done += 1
+                    elif isinstance(k, Exception):
+                        raise k
+                    else:
+                        yield f"s3://{bucket}/{k}"
+            finally:
+                # consumer stopped early or failed: release blocked producers
+                stop.set()
+                while n_done < n_submitted():
+                    if keys.get() is done:
+                        n_done += 1
+
+    def list(self, uri, start_after=None) -> Iterator[str]:
+        """
+        Generate URIs of all items at location, excluding children nodes.
+        Partitions of the listing are fetched concurrently when list_workers > 1.
+
+        start_after: only list items whose URI comes after this one
+        """
+
+        bucket = urlparse(uri).netloc
+        if start_after is not None:
+            start_after = urlparse(start_after).path[1:]
+        try:
+            if self.list_workers > 1:
+                yield from self._list_concurrent(uri, start_after)
+            else:
+                for k in self._list_keys(uri, start_after):
+                    yield f"s3://{bucket}/{k}"
+        except BotoClientError as e:
+            e = get_aws_error_info(e)
+            raise ParsingException(message=e.message, payload={'operation': e.operation_name})
@@ -1,4 +1,29 @@
-from app.reader.base import BaseReader
+from concurrent.futures import ThreadPoolExecutor
+
+from app.reader.base import BaseReader, read_concurrently
+
+
+def make_uris(exps=("exp1", "exp2", "exp3"), tps=("tp1", "tp2"), rows="ABC",
+              cols=range(12), chans=range(1, 4), sites=range(2)):
+    """
+    Generate URIs of files named like microscope outputs
+    """
+
+    return (
+        "scheme://project/"
+        + exp
+        + "/"
+        + tp
+        + "/"
+        + f"file_{row}{col:02d}_w{chan}_s{site}_exp.tiff"
+        for exp in exps
+        for tp in tps
+        for row in rows
+        for col in cols
+        for chan in chans
+        for site in sites
+    )
+
 
 class TestReader(BaseReader):
     """
@@ -6,27 +31,25 @@ class TestReader(BaseReader):
     """
 
     def __init__(self):
-        self.items = [
-            "scheme://project/"
-            + exp
-            + "/"
-            + tp
-            + "/"
-            + f"file_{row}{col:02d}_w{chan}_s{site}_exp.tiff"
-            for exp in ["exp1", "exp2", "exp3"]
-            for tp in ["tp1", "tp2"]
-            for row in ["A", "B", "C"]
-            for col in range(12)
-            for chan in range(1, 4)
-            for site in range(2)
-        ]
+        self.items = list(make_uris())
 
-    def list(self, uri) -> list[str]:
+    def list(self, uri, start_after=None) -> list[str]:
         """
-        Return all items at uri
+        Return all items at uri (that come after start_after)
         """
 
-        return [item for item in self.items if uri in item]
+        return [
+            item for item in self.items
+            if uri in item and (start_after is None or item > start_after)
+        ]
+
+    def read_many(self, uris, ordered=True, return_exceptions=False):
+        """
+        Yield (uri, content) for uris, read on a pool of threads
+        """
+        with ThreadPoolExecutor(4) as threads:
+            yield from read_concurrently(uris, self, threads, ordered=ordered,
+                                         return_exceptions=return_exceptions)
 
     def __call__(self, *args, **kwargs):
         import numpy as np
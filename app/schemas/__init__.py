@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 from .plate import PlateSchema
-from .timepoint import TimePointSchema
-from .section import SectionSchema
-from .item import ItemSchema, TagSchema
+from .timepoint import TimePointSchema, TimePointSyncSchema
+from .section import SectionLayoutArgsSchema, SectionLayoutSchema, SectionSchema
+from .item import ItemSchema, ItemExportSchema, ItemPageSchema, TagSchema
 from .compound import CompoundSchema, CompoundPropertySchema
 from .cell import CellSchema
 from .stack import StackSchema
 from .modality import ModalitySchema
+from .job import JobSchema
@@ -3,7 +3,7 @@ from app import db, ma
 from marshmallow import post_dump, validates_schema, ValidationError
 from app.models.compound import CompoundPropertyType
 
-from ..models.utils import _concat_properties
+from ..models.utils import _concat_properties_many
 from .. import models as mdl
 
 
@@ -24,12 +24,17 @@ class CompoundSchema(ma.SQLAlchemyAutoSchema):
         }
     )
 
-    @post_dump()
-    def concat_compound_props(self, data, **kwargs):
-        data = _concat_properties(
-            db, mdl.CompoundProperty, data, prefix="", id_field="property_id", **kwargs
+    @post_dump(pass_many=True)
+    def concat_compound_props(self, data, many, **kwargs):
+        records = _concat_properties_many(
+            db,
+            mdl.CompoundProperty,
+            data if many else [data],
+            prefix="",
+            id_field="property_id",
+            **kwargs,
         )
-        return data
+        return records if many else records[0]
 
 
 class CompoundPropertySchema(ma.SQLAlchemySchema):
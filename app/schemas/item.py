@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 from app.models.compound import CompoundProperty
-from ..models.utils import _concat_properties
+from ..models.utils import _concat_properties_many
 from .. import models as mdl
-from marshmallow import post_dump
+from marshmallow import post_dump, validate
+from flask import current_app
 from app import db, ma
+from app.cache import ItemCountCache
 
 class ItemSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -27,6 +29,14 @@ class ItemSchema(ma.SQLAlchemyAutoSchema):
             "tags",
         )
 
+    # tag filters, repeat the argument for several tags
+    tags_any = ma.List(ma.String(), load_only=True,
+                       metadata={"description": "Items with any of these tags"})
+    tags_all = ma.List(ma.String(), load_only=True,
+                       metadata={"description": "Items with all of these tags"})
+    tags_none = ma.List(ma.String(), load_only=True,
+                        metadata={"description": "Items with none of these tags"})
+
     _links = ma.Hyperlinks(
         {
             "self": ma.URLFor("Items.Items", values=dict(id="<id>")),
@@ -36,18 +46,56 @@ class ItemSchema(ma.SQLAlchemyAutoSchema):
         }
     )
 
-    @post_dump()
-    def concat_compound_props(self, data, **kwargs):
-        data = _concat_properties(
+    @post_dump(pass_many=True)
+    def concat_compound_props(self, data, many, **kwargs):
+        records = _concat_properties_many(
             db,
             CompoundProperty,
-            data,
+            data if many else [data],
             prefix="compound_",
             id_field="compound_property_id",
             **kwargs,
         )
-        return data
+        return records if many else records[0]
+
+
+class ItemPageSchema(ma.Schema):
+    """
+    Pagination of item listings.
 
+    Either by page number (page), or by keyset when a cursor (after) is given.
+    In the latter case, the cursor of the next page is returned in the
+    pagination header and the total count is only computed on request.
+    """
+
+    page = ma.Int(load_default=1, validate=validate.Range(min=1))
+    page_size = ma.Int(
+        load_default=current_app.config["API_ITEMS_PAGE_SIZE"],
+        validate=validate.Range(min=1, max=current_app.config["API_ITEMS_MAX_PAGE_SIZE"]),
+    )
+    after = ma.String(
+        metadata={"description": "Cursor of last item of previous page, empty for first page"}
+    )
+    count = ma.Boolean(
+        metadata={"description": "Compute total count of items (cursor mode)"}
+    )
+    count_mode = ma.String(
+        validate=validate.OneOf(ItemCountCache.modes),
+        metadata={
+            "description": "Count of items: exact, cached per filter set, "
+            "or estimated by the query planner"
+        },
+    )
+
+class ItemExportSchema(ma.Schema):
+    format = ma.String(
+        load_default="ndjson",
+        validate=validate.OneOf(["ndjson", "csv", "parquet", "arrow"]),
+    )
+    chunk_size = ma.Int(
+        load_default=current_app.config["API_ITEMS_EXPORT_CHUNK_SIZE"],
+        validate=validate.Range(min=1),
+    )
 
 
 class TagSchema(ma.SQLAlchemyAutoSchema):
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+from datetime import datetime, timezone
+
+from app.extensions import ma
+from app import models as mdl
+
+
+class JobSchema(ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = mdl.Job
+
+    status = ma.Enum(mdl.JobStatus)
+    throughput = ma.Method("get_throughput", metadata={"description": "Items per second"})
+
+    _links = ma.Hyperlinks(
+        {
+            "self": ma.URLFor("Job.Job", values=dict(id="<id>")),
+            "collection": ma.URLFor("Job.Jobs"),
+        }
+    )
+
+    def get_throughput(self, job):
+        if job.started is None:
+            return None
+
+        def as_utc(dt):
+            return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+        end = job.finished or datetime.now(timezone.utc)
+        duration = (as_utc(end) - as_utc(job.started)).total_seconds()
+        return job.n_items / duration if duration > 0 else None
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 from app import db, ma
 from app.utils import record_exists
-from marshmallow import post_dump, post_load, pre_load
+from marshmallow import ValidationError, post_dump, post_load, pre_load, validate, validates_schema
 
 from .. import models as mdl
 
@@ -70,3 +70,35 @@ class SectionSchema(ma.SQLAlchemyAutoSchema):
             record_exists(db, mdl.Cell, value=data["cell_code"], field="code")
 
         return data
+
+
+class SectionLayoutSchema(ma.Schema):
+    """
+    Section of a plate layout, refers to cell and compound by code and name
+    so that a layout can be written as a CSV table
+    """
+
+    id = ma.UUID(dump_only=True)
+    plate_id = ma.UUID(dump_only=True)
+    row_start = ma.String(required=True, validate=validate.Regexp("^[A-Z]$"))
+    row_end = ma.String(required=True, validate=validate.Regexp("^[A-Z]$"))
+    col_start = ma.Int(required=True, validate=validate.Range(min=0))
+    col_end = ma.Int(required=True, validate=validate.Range(min=0))
+    cell_code = ma.String(required=True)
+    compound_name = ma.String(required=True)
+    compound_concentration = ma.Float(allow_none=True)
+
+    @validates_schema
+    def check_start_before_end(self, data, **kwargs):
+        # only called when all fields are valid
+        if data["row_start"] > data["row_end"]:
+            raise ValidationError("row_start is after row_end.", "row_start")
+        if data["col_start"] > data["col_end"]:
+            raise ValidationError("col_start is after col_end.", "col_start")
+
+
+class SectionLayoutArgsSchema(ma.Schema):
+    replace = ma.Boolean(
+        load_default=False,
+        metadata={"description": "Delete existing sections of plate first"},
+    )
@@ -9,6 +9,7 @@ class TimePointSchema(ma.SQLAlchemyAutoSchema):
         model = mdl.TimePoint
 
     plate_id = ma.UUID()
+    last_key = ma.String(dump_only=True)
     ok_schemes = current_app.config["PARSER_SUPPORTED_SCHEMES"]
     uri = ma.String(
         validate=[validate.URL(
@@ -27,3 +28,13 @@ class TimePointSchema(ma.SQLAlchemyAutoSchema):
             'plate': ma.URLFor("Plate.Plate", values=dict(id="<plate_id>"))
         }
     )
+
+
+class TimePointSyncSchema(ma.Schema):
+    full = ma.Boolean(
+        load_default=False,
+        metadata={
+            "description": "List the whole URI and flag missing items, "
+            "instead of listing only files after the last seen one"
+        },
+    )
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Union
+
+import numpy as np
+from flask import current_app
+
+
+class MemoryLRU:
+    """
+    Thread-safe in-memory LRU mapping of arrays, bounded by total bytes
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value: np.ndarray):
+        if value.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self.n_bytes -= self._data.pop(key).nbytes
+            self._data[key] = value
+            self.n_bytes += value.nbytes
+            while self.n_bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.n_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.n_bytes = 0
+
+
+class DiskLRU:
+    """
+    Arrays stored as .npy files in a directory, bounded by total bytes.
+    Files are touched when read, the least recently used are removed first.
+    The directory can be shared by several processes.
+    """
+
+    suffix = ".npy"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.n_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _entries(self):
+        """(path, last access, size) of cached files"""
+
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def get(self, key, mmap: bool = False):
+        """Array stored at key, memory-mapped read-only if mmap"""
+
+        path = self._path(key)
+        try:
+            value = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return value
+
+    def put(self, key, value: np.ndarray):
+        # write then rename, so that readers never see partial files
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, value, allow_pickle=False)
+        os.replace(tmp, self._path(key))
+
+        self.n_bytes += os.path.getsize(self._path(key))
+        if self.n_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used files until size is within bounds"""
+
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self.n_bytes = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self.n_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.n_bytes -= size
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            os.remove(path)
+        self.n_bytes = 0
+
+
+class ThumbnailCache:
+    """
+    Downsampled images keyed by URI and ETag of the source file.
+
+    Lookups go through a per-process memory tier, then a disk tier,
+    and only download and resize the source file (reader.__call__) on a miss.
+    A changed ETag gives a new key, stale entries are evicted in LRU order.
+    Keys are reused for key_ttl seconds before their ETag is looked up again.
+    """
+
+    def __init__(self, app=None, reader=None):
+        if app is not None:
+            self.init_app(app, reader)
+
+    def init_app(self, app, reader):
+        self.reader = reader
+        self.memory = MemoryLRU(app.config["THUMBNAIL_CACHE_MEMORY_BYTES"])
+        directory = app.config["THUMBNAIL_CACHE_DIR"]
+        self.disk = (
+            DiskLRU(directory, app.config["THUMBNAIL_CACHE_DISK_BYTES"])
+            if directory
+            else None
+        )
+        self.prefetch_workers = app.config["THUMBNAIL_PREFETCH_WORKERS"]
+        self.prefetch_max_pending = app.config["THUMBNAIL_PREFETCH_MAX_PENDING"]
+        self.key_ttl = app.config["THUMBNAIL_KEY_TTL"]
+        # uri -> (key, expiry time), in expiry order
+        self._keys = OrderedDict()
+        self._keys_lock = threading.Lock()
+        self._prefetch_pool = None
+        self._prefetching = set()
+        self._prefetch_lock = threading.Lock()
+
+    def key(self, uri: str, etag: Union[str, None]) -> str:
+        size = getattr(self.reader, "size", None)
+        return hashlib.sha256(f"{uri}|{etag}|{size}".encode()).hexdigest()
+
+    def _load(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        image = None
+        if self.disk is not None:
+            image = self.disk.get(key)
+
+        if image is None:
+            image = compute()
+            if self.disk is not None:
+                self.disk.put(key, image)
+
+        return image
+
+    def cached(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """Array stored at key, computed and stored on a miss"""
+
+        image = self.memory.get(key)
+        if image is None:
+            image = self._load(key, compute)
+            self.memory.put(key, image)
+
+        return image
+
+    def _recent_keys(self, uris: Iterable[str]) -> dict:
+        """Keys of uris looked up less than key_ttl seconds ago"""
+
+        now = time.monotonic()
+        with self._keys_lock:
+            while self._keys and next(iter(self._keys.values()))[1] <= now:
+                self._keys.popitem(last=False)
+            return {uri: self._keys[uri][0] for uri in uris if uri in self._keys}
+
+    def _remember_keys(self, keys: dict):
+        expiry = time.monotonic() + self.key_ttl
+        with self._keys_lock:
+            for uri, key in keys.items():
+                self._keys.pop(uri, None)
+                self._keys[uri] = (key, expiry)
+
+    def key_of(self, uri: str) -> str:
+        """Current key of file at uri"""
+
+        return self.keys_of([uri])[0]
+
+    def keys_of(self, uris: Iterable[str]) -> list:
+        """
+        Current keys of files at uris, ETags not looked up recently are
+        looked up in batch by the reader
+        """
+
+        uris = list(uris)
+        keys = self._recent_keys(uris)
+        looked_up = {
+            uri: self.key(uri, etag)
+            for uri, etag in self.reader.etags([uri for uri in uris if uri not in keys])
+        }
+        self._remember_keys(looked_up)
+        keys.update(looked_up)
+
+        return [keys[uri] for uri in uris]
+
+    def get(self, uri: str, key: Union[str, None] = None) -> np.ndarray:
+        """
+        Thumbnail of file at uri, computed on first request.
+        key: as returned by key_of, avoids looking up the ETag again
+        """
+
+        if key is None:
+            key = self.key_of(uri)
+
+        return self.cached(key, lambda: self.reader(uri))
+
+    __call__ = get
+
+    def get_many(
+        self, uris: Iterable[str], keys: Union[list, None] = None, return_exceptions=False
+    ) -> list:
+        """
+        Thumbnails of uris, the ones not cached read in batch through the
+        reader (reader.read_many).
+        keys: as returned by keys_of, avoids looking up the ETags again
+        return_exceptions: give the exception of a file that fails to read
+            instead of raising it
+        """
+
+        uris = list(uris)
+        if keys is None:
+            keys = self.keys_of(uris)
+
+        images, missing = {}, {}
+        for uri, key in zip(uris, keys):
+            image = self.memory.get(key)
+            if image is None and self.disk is not None:
+                image = self.disk.get(key)
+                if image is not None:
+                    self.memory.put(key, image)
+            if image is None:
+                missing[uri] = key
+            else:
+                images[uri] = image
+
+        for uri, image in self.reader.read_many(
+            list(missing), ordered=False, return_exceptions=return_exceptions
+        ):
+            if not isinstance(image, Exception):
+                if self.disk is not None:
+                    self.disk.put(missing[uri], image)
+                self.memory.put(missing[uri], image)
+            images[uri] = image
+
+        return [images[uri] for uri in uris]
+
+    def _contains(self, key: str) -> bool:
+        if self.disk is None:
+            return self.memory.get(key) is not None
+        return os.path.exists(self.disk._path(key))
+
+    def _store(self, key: str, image: np.ndarray):
+        if self.disk is None:
+            self.memory.put(key, image)
+        else:
+            self.disk.put(key, image)
+
+    def warm(self, uris: Iterable[str]) -> int:
+        """
+        Compute thumbnails of uris that are not cached yet, e.g. after ingestion,
+        read in batch through the reader (reader.read_many).
+        Returns their number.
+        """
+
+        uris = list(uris)
+        missing = {
+            uri: key for uri, key in zip(uris, self.keys_of(uris)) if not self._contains(key)
+        }
+        for uri, image in self.reader.read_many(list(missing), ordered=False):
+            self._store(missing[uri], image)
+
+        current_app.logger.info(f"Cached {len(missing)} thumbnails")
+        return len(missing)
+
+    def prefetch(self, uris: Iterable[str]) -> int:
+        """
+        Compute thumbnails of uris in background threads.
+        URIs already in flight are skipped, as well as all URIs beyond
+        prefetch_max_pending in flight, to bound the load on storage.
+        Returns the number of scheduled URIs.
+        """
+
+        logger = current_app.logger
+
+        def fetch(uri):
+            try:
+                self.get(uri)
+            except Exception as e:
+                logger.warning(f"Prefetching {uri} failed: {e!r}")
+            finally:
+                with self._prefetch_lock:
+                    self._prefetching.discard(uri)
+
+        n_scheduled = 0
+        with self._prefetch_lock:
+            if self._prefetch_pool is None:
+                self._prefetch_pool = ThreadPoolExecutor(
+                    self.prefetch_workers, thread_name_prefix="prefetch"
+                )
+            for uri in uris:
+                if len(self._prefetching) >= self.prefetch_max_pending:
+                    break
+                if uri in self._prefetching:
+                    continue
+                self._prefetching.add(uri)
+                self._prefetch_pool.submit(fetch, uri)
+                n_scheduled += 1
+
+        return n_scheduled
+
+    def clear(self):
+        with self._keys_lock:
+            self._keys.clear()
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
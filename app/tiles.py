@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import hashlib
+import math
+import threading
+from typing import Union
+
+import numpy as np
+
+from .thumbnails import DiskLRU
+
+
+def downsample(image: np.ndarray) -> np.ndarray:
+    """Halve width and height of image by averaging 2x2 blocks"""
+
+    h, w = image.shape[:2]
+    pad = ((0, h % 2), (0, w % 2)) + ((0, 0),) * (image.ndim - 2)
+    image = np.pad(image, pad, mode="edge")
+    h, w = image.shape[:2]
+    blocks = image.reshape(h // 2, 2, w // 2, 2, *image.shape[2:])
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+
+def max_zoom(shape, tile_size: int) -> int:
+    """Zoom level at which the image is at full resolution"""
+
+    return max(0, math.ceil(math.log2(max(shape[:2]) / tile_size)))
+
+
+class TileCache:
+    """
+    Deep-zoom pyramids of item images, decoded once and kept on disk.
+
+    Level max_zoom is the full resolution image, each lower level halves it,
+    level 0 fits in a single tile. Levels are stored as .npy files that are
+    memory-mapped when tiles are read, so a tile only reads its region.
+    Pyramids are keyed by URI and ETag of the source file, and evicted in
+    LRU order (per level, and their info) when the directory exceeds its size.
+    """
+
+    # locks of pyramids being built, shared by keys with the same hash
+    n_locks = 64
+    info_fields = ("width", "height", "tile_size", "max_zoom", "min", "max")
+
+    def __init__(self, app=None, reader=None):
+        if app is not None:
+            self.init_app(app, reader)
+
+    def init_app(self, app, reader):
+        self.reader = reader
+        self.tile_size = app.config["TILE_SIZE"]
+        if not app.config["TILE_CACHE_DIR"]:
+            raise ValueError("TILE_CACHE_DIR must be set")
+        self.disk = DiskLRU(app.config["TILE_CACHE_DIR"], app.config["TILE_CACHE_DISK_BYTES"])
+        self._locks = [threading.Lock() for _ in range(self.n_locks)]
+
+    def key_of(self, uri: str) -> str:
+        etag = self.reader.etag(uri)
+        return hashlib.sha256(f"{uri}|{etag}|{self.tile_size}".encode()).hexdigest()
+
+    def _lock(self, key):
+        return self._locks[int(key[:8], 16) % self.n_locks]
+
+    def _get_info(self, key):
+        values = self.disk.get(f"{key}-info")
+        if values is None:
+            return None
+        info = dict(zip(self.info_fields, values.tolist()))
+        for k in ["width", "height", "tile_size", "max_zoom"]:
+            info[k] = int(info[k])
+        return info
+
+    def _build(self, key: str, uri: str) -> dict:
+        image = self.reader.read(uri)
+        top = max_zoom(image.shape, self.tile_size)
+        info = {
+            "width": image.shape[1],
+            "height": image.shape[0],
+            "tile_size": self.tile_size,
+            "max_zoom": top,
+            "min": float(image.min()),
+            "max": float(image.max()),
+        }
+
+        level = image
+        for z in range(top, -1, -1):
+            self.disk.put(f"{key}-{z}", level)
+            if z > 0:
+                level = downsample(level)
+
+        # written last: pyramids with an info are complete
+        self.disk.put(
+            f"{key}-info", np.array([info[k] for k in self.info_fields], dtype=np.float64)
+        )
+        return info
+
+    def info(self, uri: str, key: Union[str, None] = None) -> dict:
+        """Size of image and zoom levels, builds pyramid on first request"""
+
+        key = key or self.key_of(uri)
+        info = self._get_info(key)
+        if info is not None:
+            return info
+
+        with self._lock(key):
+            return self._get_info(key) or self._build(key, uri)
+
+    def tile(self, uri: str, z: int, x: int, y: int, key: Union[str, None] = None):
+        """
+        Region of level z at column x, row y of the tile grid,
+        None if out of range
+        """
+
+        key = key or self.key_of(uri)
+        info = self.info(uri, key)
+        if not 0 <= z <= info["max_zoom"] or x < 0 or y < 0:
+            return None
+
+        level = self.disk.get(f"{key}-{z}", mmap=True)
+        if level is None:
+            # evicted: rebuild the whole pyramid
+            with self._lock(key):
+                self._build(key, uri)
+            level = self.disk.get(f"{key}-{z}", mmap=True)
+
+        size = self.tile_size
+        tile = level[y * size:(y + 1) * size, x * size:(x + 1) * size]
+        if tile.size == 0:
+            return None
+        return np.array(tile)
+
+    def clear(self):
+        self.disk.clear()
@@ -1,7 +1,7 @@
 import json
 
 import json2table
-from flask import render_template, request
+from flask import current_app, render_template, request
 from flask.views import View
 
 
@@ -15,10 +15,21 @@ def infer_columns(data: list[dict]):
     return data_[-1].keys()
 
 
-def make_item_pagination(items, page, items_per_page):
+def make_item_pagination(items, page, items_per_page, count_key):
+    """
+    Page of items and their pagination. Their total is counted following
+    VIEWS_ITEMS_COUNT_MODE, cached counts are identified by count_key
+    """
+
+    from app.extensions import item_counts
     from app.schemas.item import ItemSchema
 
-    items_paginate = items.paginate(page=page, per_page=items_per_page, error_out=False)
+    items_paginate = items.paginate(
+        page=page, per_page=items_per_page, error_out=False, count=False
+    )
+    items_paginate.total, _ = item_counts.count(
+        items, count_key, current_app.config["VIEWS_ITEMS_COUNT_MODE"]
+    )
     items = ItemSchema(many=True).dump(items_paginate)
 
     if items:
@@ -74,15 +85,17 @@ class GenericDetailedView(View):
 
     def dispatch_request(self, id):
         # build items meta data
-        from app.api.v1.item import get_items_with_meta
+        from app.api.v1.item import filter_items_by_parent, get_items_with_meta
         from app import db
 
         items = get_items_with_meta()
-        items = items.filter(self.model.id == id)
+        items = filter_items_by_parent(items, self.model, id)
 
         page = request.args.get("page", 1, type=int)
 
-        items_paginate, items = make_item_pagination(items, page, self.items_per_page)
+        items_paginate, items = make_item_pagination(
+            items, page, self.items_per_page, f"{self.model.__tablename__}={id}"
+        )
 
         items = self.remove_sub_ids(items)
         items = [
@@ -157,12 +170,13 @@ def register_views(app, reader=None):
     from .index import bp as main_bp
 
     with app.app_context():
-        from .remote_item import RemoteItemView
+        from .remote_item import ItemImageView, ItemTilesView, RemoteItemView
+        from ..extensions import tiles
 
         from .. import models as mdl
         from .. import schemas as sch
         from . import GenericDetailedView, ListView
-        from .plate import DetailedPlateView
+        from .plate import DetailedPlateView, PlateMontageView
         from .stack import StackView
         from .compound import CompoundView
 
@@ -202,6 +216,10 @@ def register_views(app, reader=None):
                 app.config["VIEWS_ITEMS_PER_PAGE"],
             ),
         )
+        app.add_url_rule(
+            "/plate/<uuid:id>/montage.<any(png, webp):format>",
+            view_func=PlateMontageView.as_view("plate_montage", reader),
+        )
         app.add_url_rule(
             f"/stack/detail/<uuid:id>",
             view_func=StackView.as_view(
@@ -237,6 +255,15 @@ def register_views(app, reader=None):
                 "item", reader, app.config["VIEWS_ITEMS_PER_PAGE"]
             ),
         )
+        app.add_url_rule(
+            "/item/<uuid:id>/image.<any(png, webp):format>",
+            view_func=ItemImageView.as_view("item_image", reader),
+        )
+        tiles_view = ItemTilesView.as_view("item_tiles", tiles)
+        app.add_url_rule("/item/<uuid:id>/tiles", view_func=tiles_view)
+        app.add_url_rule(
+            "/item/<uuid:id>/tiles/<int:z>/<int:x>/<int:y>", view_func=tiles_view
+        )
 
         app.add_url_rule(
             "/compound/list/",
@@ -4,7 +4,7 @@ from flask import (Blueprint, Markup, flash, redirect, render_template,
                    render_template_string, request, session, url_for)
 from flask_flatpages import pygments_style_defs
 
-from .. import pages
+from .. import pages, parser
 
 bp = Blueprint("index", __name__, template_folder="templates", static_folder="static")
 
@@ -19,6 +19,12 @@ def get():
     return {"success": True, "message": "healthy"}
 
 
+@bp.route("/stats/reader")
+def reader_stats():
+    """Usage counters of the file reader of this process"""
+    return parser.reader.stats()
+
+
 @bp.route("/")
 def index():
     return redirect(url_for('plate_list'))
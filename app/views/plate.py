@@ -1,11 +1,20 @@
+import hashlib
+import uuid
 from collections import OrderedDict
 
 import json2table
-from flask import url_for
+import numpy as np
+from flask import abort, current_app, make_response, request, url_for
+from flask.views import View
+from skimage.transform import resize
 
 from ..schemas.plate import PlateSchema
 from ..schemas.section import SectionSchema
 from . import GenericDetailedView
+from .remote_item import IMAGE_MIMETYPES, cached_response, encode_image, to_uint8
+
+# (rows, columns) of standard plates
+PLATE_FORMATS = [(8, 12), (16, 24), (32, 48)]
 
 
 def make_link_compound(cpd):
@@ -86,3 +95,127 @@ class DetailedPlateView(GenericDetailedView):
         )
 
         return table
+
+
+def well_positions(wells):
+    """
+    Place wells given as (row letter, column number) on the smallest
+    standard plate that contains them.
+    Columns are numbered from 1, or from 0 when a column 0 exists.
+
+    Returns (n_rows, n_cols) and a list of (i, j) positions of wells.
+    """
+
+    offset = min(1, min(col for _, col in wells))
+    positions = [(ord(row) - ord("A"), col - offset) for row, col in wells]
+
+    n_rows = max(i for i, _ in positions) + 1
+    n_cols = max(j for _, j in positions) + 1
+    shape = next(
+        ((r, c) for r, c in PLATE_FORMATS if n_rows <= r and n_cols <= c),
+        (n_rows, n_cols),
+    )
+    return shape, positions
+
+
+def compose_montage(shape, positions, images, size: int) -> np.ndarray:
+    """
+    Lay out images resized to size x size on a grid of shape, as an 8-bit
+    image with a common contrast range. Wells without image are left black.
+    """
+
+    mosaic = np.full((shape[0] * size, shape[1] * size), np.nan, dtype=np.float32)
+    for (i, j), image in zip(positions, images):
+        if image is None:
+            continue
+        if image.ndim == 3:
+            image = image.mean(axis=2)
+        mosaic[i * size:(i + 1) * size, j * size:(j + 1) * size] = resize(
+            image, (size, size), preserve_range=True, anti_aliasing=True
+        )
+
+    if np.isnan(mosaic).all():
+        return np.zeros(mosaic.shape, dtype=np.uint8)
+
+    low = np.nanmin(mosaic)
+    mosaic = np.nan_to_num(mosaic, copy=False, nan=low)
+    return to_uint8(mosaic)
+
+
+class PlateMontageView(View):
+    """
+    View that lays out the thumbnails of all wells of a plate in one image,
+    for a given timepoint (latest by default), channel and site.
+
+    Montages are cached with the thumbnails, keyed by the thumbnail keys
+    (URI and ETag) of their items, so that overwritten files give new ones.
+    """
+
+    def __init__(self, thumbnails):
+        self.thumbnails = thumbnails
+
+    def fetch(self, uris, keys):
+        """Thumbnails of uris read in batch, None if failed"""
+
+        logger = current_app.logger
+        images = self.thumbnails.get_many(uris, keys, return_exceptions=True)
+        for uri, image in zip(uris, images):
+            if isinstance(image, Exception):
+                # a failed well is left blank, not the whole montage
+                logger.warning(f"No thumbnail for {uri}: {image!r}")
+
+        return [None if isinstance(image, Exception) else image for image in images]
+
+    def dispatch_request(self, id, format):
+        from .. import db
+        from .. import models as mdl
+
+        timepoint_id = request.args.get("timepoint_id", None, type=uuid.UUID)
+        if timepoint_id is None:
+            timepoint_id = (
+                db.session.query(mdl.TimePoint.id)
+                .filter_by(plate_id=id)
+                .order_by(mdl.TimePoint.time.desc())
+                .limit(1)
+                .scalar()
+            )
+
+        items = db.session.query(mdl.Item.row, mdl.Item.col, mdl.Item.uri).filter_by(
+            plate_id=id, timepoint_id=timepoint_id, missing=False
+        )
+        for field in ["chan", "site"]:
+            value = request.args.get(field, None, type=int)
+            if value is None:
+                value = items.with_entities(db.func.min(getattr(mdl.Item, field))).scalar()
+            items = items.filter(getattr(mdl.Item, field) == value)
+
+        items = items.order_by(mdl.Item.row, mdl.Item.col, mdl.Item.uri).all()
+        if not items:
+            abort(404)
+        # one image per well
+        wells = {}
+        for row, col, uri in items:
+            wells.setdefault((row, col), uri)
+
+        config = current_app.config
+        size = request.args.get("size", config["VIEWS_MONTAGE_WELL_SIZE"], type=int)
+        if not 1 <= size <= config["VIEWS_MONTAGE_MAX_WELL_SIZE"]:
+            abort(400, f"size must be within 1 and {config['VIEWS_MONTAGE_MAX_WELL_SIZE']}")
+
+        uris = list(wells.values())
+        keys = self.thumbnails.keys_of(uris)
+        key = hashlib.sha256("|".join(["montage", str(size)] + keys).encode()).hexdigest()
+        etag = f"{key}-{format}"
+        if etag in request.if_none_match:
+            return cached_response(make_response("", 304), etag)
+
+        def compute():
+            shape, positions = well_positions(list(wells))
+            images = self.fetch(uris, keys)
+            return compose_montage(shape, positions, images, size)
+
+        montage = self.thumbnails.cached(key, compute)
+
+        response = make_response(encode_image(montage, format))
+        response.mimetype = IMAGE_MIMETYPES[format]
+        return cached_response(response, etag)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import io
 import json
 import mimetypes
 
@@ -7,20 +8,155 @@ import json2table
 import numpy as np
 import plotly
 import plotly.express as px
-from app.api.v1.item import get_items_with_meta
-from flask import render_template
+from app.api.v1.item import filter_items_by_parent, get_items_with_meta
+from flask import abort, current_app, make_response, render_template, request, url_for
 from flask.views import View
+from PIL import Image
 
 from ..schemas.item import ItemSchema
 from ..reader.base import BaseReader
 
 
+IMAGE_MIMETYPES = {"png": "image/png", "webp": "image/webp"}
+
+
+def to_uint8(image: np.ndarray, low=None, high=None) -> np.ndarray:
+    """
+    Stretch contrast of image to the full 8-bit range,
+    from low and high (min and max of image by default)
+    """
+
+    image = np.asarray(image, dtype=np.float32)
+    low = image.min() if low is None else low
+    high = image.max() if high is None else high
+    scale = 255 / (high - low) if high > low else 0
+    image = (image - low) * scale
+    image = image.clip(0, 255, out=image)
+    return image.round(out=image).astype(np.uint8)
+
+
+def encode_image(image: np.ndarray, format: str, low=None, high=None) -> bytes:
+    buffer = io.BytesIO()
+    image = Image.fromarray(to_uint8(image, low, high))
+    if format == "webp":
+        image.save(buffer, format="WEBP", lossless=True)
+    else:
+        image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ItemImageView(View):
+    """
+    View that returns the thumbnail of an item as an 8-bit PNG/WebP image
+    """
+
+    def __init__(self, thumbnails):
+        self.thumbnails = thumbnails
+
+    def dispatch_request(self, id, format):
+        from .. import db
+        from ..models.item import Item
+
+        item = db.session.get(Item, id)
+        if item is None:
+            abort(404)
+
+        # thumbnail key changes with content of file
+        key = self.thumbnails.key_of(item.uri)
+        etag = f"{key}-{format}"
+        if etag in request.if_none_match:
+            response = make_response("", 304)
+        else:
+            image = self.thumbnails.get(item.uri, key=key)
+            response = make_response(encode_image(image, format))
+            response.mimetype = IMAGE_MIMETYPES[format]
+
+        return cached_response(response, etag)
+
+
+def cached_response(response, etag):
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["VIEWS_IMAGE_MAX_AGE"]
+    return response
+
+
+class ItemTilesView(View):
+    """
+    View that returns a tile of the deep-zoom pyramid of an item,
+    or the description of the pyramid when no tile is given
+    """
+
+    def __init__(self, tiles):
+        self.tiles = tiles
+
+    def dispatch_request(self, id, z=None, x=None, y=None):
+        from .. import db
+        from ..models.item import Item
+
+        item = db.session.get(Item, id)
+        if item is None:
+            abort(404)
+
+        key = self.tiles.key_of(item.uri)
+        format = current_app.config["VIEWS_IMAGE_FORMAT"]
+        etag = f"{key}-{z}-{x}-{y}-{format}"
+        if etag in request.if_none_match:
+            return cached_response(make_response("", 304), etag)
+
+        info = self.tiles.info(item.uri, key)
+        if z is None:
+            return cached_response(make_response(info), etag)
+
+        tile = self.tiles.tile(item.uri, z, x, y, key)
+        if tile is None:
+            abort(404)
+
+        # same contrast stretch for all tiles of the image
+        response = make_response(encode_image(tile, format, info["min"], info["max"]))
+        response.mimetype = IMAGE_MIMETYPES[format]
+        return cached_response(response, etag)
+
+
+def neighbour_uris(item) -> list:
+    """
+    URIs of the items a user is likely to view after item: other channels
+    of the same well and site, then the same channel of the next site
+    (if items have sites)
+    """
+
+    from sqlalchemy import and_, or_
+
+    from .. import db
+    from ..models.item import Item
+
+    same_site = Item.site == item.site
+    if item.site is not None:
+        same_site = or_(same_site, and_(Item.site == item.site + 1, Item.chan == item.chan))
+
+    neighbours = (
+        db.session.query(Item.uri)
+        .filter(
+            Item.plate_id == item.plate_id,
+            Item.timepoint_id == item.timepoint_id,
+            Item.row == item.row,
+            Item.col == item.col,
+            Item.missing.is_(False),
+            Item.id != item.id,
+            same_site,
+        )
+        .order_by(Item.site, Item.chan)
+    )
+    return [uri for uri, in neighbours]
+
+
 class RemoteItemView(View):
     """
     View class that displays a remote data item
     """
 
     def __init__(self, reader: BaseReader, items_per_page=20):
+        # reader or thumbnail cache, returns downsampled images
         self.reader = reader
 
     @staticmethod
@@ -42,10 +178,11 @@ class RemoteItemView(View):
         """
         """
 
+        from .. import db
         from ..models.item import Item
 
         q = get_items_with_meta()
-        item = q.filter(Item.id == id).first()
+        item = filter_items_by_parent(q, Item, id).first()
         meta_data = ItemSchema().dump(item)
         meta_table = json2table.convert(
             meta_data,
@@ -56,12 +193,26 @@ class RemoteItemView(View):
             },
         )
 
-        content = self.reader(item.uri)
         type_ = self.guess_type(item.uri)
 
         kwargs = {}
         if type_ == 'image':
-            kwargs['graph_json'] = self.image_to_json(content)
+            if request.args.get("interactive", 0, type=int):
+                kwargs['graph_json'] = self.image_to_json(self.reader(item.uri))
+            else:
+                kwargs['image_url'] = url_for(
+                    "item_image", id=id, format=current_app.config["VIEWS_IMAGE_FORMAT"]
+                )
+                kwargs['interactive_url'] = url_for("item", id=id, interactive=1)
+
+            if current_app.config["VIEWS_PREFETCH_NEIGHBOURS"] and hasattr(
+                self.reader, "prefetch"
+            ):
+                # best effort, the page does not depend on it
+                try:
+                    self.reader.prefetch(neighbour_uris(db.session.get(Item, id)))
+                except Exception as e:
+                    current_app.logger.warning(f"Prefetching neighbours of {id} failed: {e!r}")
 
         return render_template(
             "detail/item.html",
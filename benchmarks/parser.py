@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of URI parsing over a synthetic listing.
+
+Run with: python -m benchmarks.parser [n_keys]
+"""
+import re
+import sys
+import time
+from itertools import islice
+
+from app.config import Config
+from app.parser import Parser
+from app.reader.base import BaseReader
+from app.reader.test import make_uris
+
+
+class ListReader(BaseReader):
+    def __init__(self, uris):
+        self.uris = uris
+
+    def list(self, uri):
+        return self.uris
+
+
+def legacy_parse(uris, additional_rex, ignore_rex, valid_rex):
+    """Parsing as done before patterns were compiled once"""
+
+    items = [
+        {"uri": uri}
+        for uri in uris
+        if not re.compile(ignore_rex).match(uri) and re.compile(valid_rex).match(uri)
+    ]
+    for k, v in additional_rex.items():
+        rex = re.compile(v)
+        matches = [rex.search(item["uri"]) for item in items]
+        items = [{**r, k: m.group(1)} for r, m in zip(items, matches)]
+    return items
+
+
+def make_listing(n_keys):
+    # 16x24 plate, 4 channels, 9 sites per well, many timepoints
+    uris = make_uris(
+        exps=["exp1"],
+        tps=[f"tp{t}" for t in range(n_keys // (16 * 24 * 4 * 9) + 1)],
+        rows="ABCDEFGHIJKLMNOP",
+        cols=range(1, 25),
+        chans=range(1, 5),
+        sites=range(9),
+    )
+    uris = list(islice(uris, n_keys))
+    # some thumbnails and non-image files, to be filtered out
+    uris += [u.replace(".tiff", "_thumb.tiff") for u in uris[:n_keys // 100]]
+    uris += [u.replace(".tiff", ".txt") for u in uris[:n_keys // 100]]
+    return uris
+
+
+def main(n_keys=1_000_000):
+    uris = make_listing(n_keys)
+    args = {
+        "additional_rex": Config.ADDITIONAL_REGEXP,
+        "ignore_rex": Config.IGNORE_REGEXP,
+        "valid_rex": Config.VALID_REGEXP,
+    }
+
+    start = time.perf_counter()
+    expected = legacy_parse(uris, **args)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n_items = 0
+    for record, expected_record in zip(Parser(ListReader(uris)).iter("", **args), expected):
+        assert record == expected_record
+        n_items += 1
+    compiled = time.perf_counter() - start
+    assert n_items == len(expected)
+
+    print(f"{len(uris)} keys, {n_items} items")
+    print(f"legacy:   {legacy:.2f}s ({len(uris) / legacy:,.0f} keys/s)")
+    print(f"compiled: {compiled:.2f}s ({len(uris) / compiled:,.0f} keys/s)")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark of tag filtering of items over a synthetic dataset:
+regexp over aggregated tag names versus semi-joins on item_tag_assoc.
+
+Run with: python -m benchmarks.tags [n_items]
+Uses a temporary SQLite database, or BENCHMARK_DATABASE_URI if set.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+
+def legacy_filter(db, items, tag):
+    """Tag filtering as done before semi-joins"""
+
+    items = items.subquery()
+    return db.session.query(items).filter(items.c.tags.regexp_match(f"({tag},)|({tag}$)"))
+
+
+def make_app(uri):
+    from app.extensions import db, jobs, ma, parser
+    from app.reader.test import TestReader
+
+    app = Flask(__name__)
+    app.config.from_object("app.config.test")
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    db.init_app(app)
+    ma.init_app(app)
+    parser.init_app(app, TestReader())
+    jobs.init_app(app)
+    return app
+
+
+def populate(n_items, rare=0.01, common=0.5):
+    from app import db
+    from app import models as mdl
+    from app.dummy_db import _populate_db
+    from app.ingest import insert_items
+
+    _populate_db()
+    plate = mdl.Plate.query.first()
+    timepoint = mdl.TimePoint(uri="scheme://bench/tp/", plate_id=plate.id)
+    db.session.add(timepoint)
+    db.session.flush()
+
+    # wells of the sections of the dummy plate, channels of its stack
+    wells = [(row, col, chan) for row in "AB" for col in range(1, 13) for chan in (1, 2, 3)]
+    records = (
+        {
+            "uri": f"scheme://bench/tp/file_{row}{col:02d}_w{chan}_s{i // len(wells)}.tiff",
+            "row": row,
+            "col": col,
+            "chan": chan,
+            "site": i // len(wells),
+        }
+        for i, (row, col, chan) in ((i, wells[i % len(wells)]) for i in range(n_items))
+    )
+    insert_items(records, plate.id, timepoint.id, batch_size=50_000, progress=lambda n: None)
+
+    tags = {name: mdl.Tag(name=name) for name in ["rare", "common"]}
+    db.session.add_all(tags.values())
+    db.session.flush()
+
+    random.seed(0)
+    ids = [i for i, in db.session.query(mdl.Item.id).filter_by(timepoint_id=timepoint.id)]
+    for name, fraction in [("rare", rare), ("common", common)]:
+        db.session.execute(
+            mdl.ItemTagAssociation.__table__.insert(),
+            [
+                {"item_id": id, "tag_id": tags[name].id}
+                for id in random.sample(ids, int(fraction * len(ids)))
+            ],
+        )
+    db.session.commit()
+
+
+def timed(query, page_size=100):
+    start = time.perf_counter()
+    n_items = query.order_by(None).count()
+    count = time.perf_counter() - start
+
+    start = time.perf_counter()
+    query.limit(page_size).all()
+    page = time.perf_counter() - start
+    return n_items, count, page
+
+
+def main(n_items=1_000_000):
+    from app import db
+    from app import models as mdl
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = os.environ.get("BENCHMARK_DATABASE_URI", f"sqlite:///{tmp}/bench.sqlite")
+        app = make_app(uri)
+        with app.app_context():
+            # schemas read the configuration when imported
+            from app.api.v1.item import filter_items_by_tags, get_items_with_meta
+
+            db.drop_all()
+            db.create_all()
+            start = time.perf_counter()
+            populate(n_items)
+            print(f"populated {n_items} items in {time.perf_counter() - start:.1f}s")
+
+            for tag in ["rare", "common"]:
+                legacy = timed(legacy_filter(db, get_items_with_meta(), tag))
+                semi_join = timed(
+                    filter_items_by_tags(get_items_with_meta(), mdl.Item.id, any_=[tag])
+                )
+                assert legacy[0] == semi_join[0]
+                print(f"tag {tag!r}: {legacy[0]} items")
+                for name, (_, count, page) in [("regexp", legacy), ("semi-join", semi_join)]:
+                    print(f"  {name:10} count {count:.2f}s, first page {page:.3f}s")
+
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
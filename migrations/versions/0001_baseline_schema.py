@@ -0,0 +1,233 @@
+"""Baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 13:54:13.013098
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() before there were migrations
+    # already have these tables; `flask db upgrade` only needs to record them.
+    if "plate" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('cell',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('code', sa.String(length=100), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cell', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cell_id'), ['id'], unique=False)
+
+    op.create_table('compound_property',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.Enum('moa_group', 'moa_subgroup', 'target', name='compoundpropertytype'), nullable=False),
+    sa.Column('value', sa.String(length=100), nullable=False),
+    sa.Column('tree_id', sa.Integer(), nullable=True),
+    sa.Column('parent_id', sa.Integer(), nullable=True),
+    sa.Column('lft', sa.Integer(), nullable=False),
+    sa.Column('rgt', sa.Integer(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['parent_id'], ['compound_property.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('compound_property', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_compound_property_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_compound_property_level'), ['level'], unique=False)
+        batch_op.create_index(batch_op.f('ix_compound_property_lft'), ['lft'], unique=False)
+        batch_op.create_index(batch_op.f('ix_compound_property_rgt'), ['rgt'], unique=False)
+
+    op.create_table('modality',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('target', sa.String(length=100), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('modality', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_modality_id'), ['id'], unique=False)
+
+    op.create_table('stack',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stack', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stack_id'), ['id'], unique=False)
+
+    op.create_table('tag',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tag_id'), ['id'], unique=False)
+
+    op.create_table('compound',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('bcs', sa.String(length=100), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['property_id'], ['compound_property.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('compound', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_compound_id'), ['id'], unique=False)
+
+    op.create_table('plate',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('date', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('origin', sa.String(length=100), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('project', sa.String(length=100), nullable=True),
+    sa.Column('stack_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.ForeignKeyConstraint(['stack_id'], ['stack.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('plate', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_plate_id'), ['id'], unique=False)
+
+    op.create_table('stack_modality_assoc',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('stack_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('modality_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('chan', sa.Integer(), nullable=True),
+    sa.Column('regexp', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['modality_id'], ['modality.id'], ),
+    sa.ForeignKeyConstraint(['stack_id'], ['stack.id'], ),
+    sa.PrimaryKeyConstraint('id', 'stack_id', 'modality_id')
+    )
+    with op.batch_alter_table('stack_modality_assoc', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stack_modality_assoc_modality_id'), ['modality_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_stack_modality_assoc_stack_id'), ['stack_id'], unique=False)
+
+    op.create_table('section',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('col_start', sa.Integer(), nullable=True),
+    sa.Column('col_end', sa.Integer(), nullable=True),
+    sa.Column('row_start', sa.String(length=1), nullable=True),
+    sa.Column('row_end', sa.String(length=1), nullable=True),
+    sa.Column('compound_concentration', sa.Float(), nullable=True),
+    sa.Column('plate_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('cell_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('compound_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.ForeignKeyConstraint(['cell_id'], ['cell.id'], ),
+    sa.ForeignKeyConstraint(['compound_id'], ['compound.id'], ),
+    sa.ForeignKeyConstraint(['plate_id'], ['plate.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('section', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_section_id'), ['id'], unique=False)
+
+    op.create_table('timepoint',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('time', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('uri', sa.String(length=300), nullable=True),
+    sa.Column('plate_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.ForeignKeyConstraint(['plate_id'], ['plate.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('timepoint', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_timepoint_id'), ['id'], unique=False)
+
+    op.create_table('item',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('uri', sa.String(length=300), nullable=True),
+    sa.Column('row', sa.String(length=1), nullable=True),
+    sa.Column('col', sa.Integer(), nullable=True),
+    sa.Column('site', sa.Integer(), nullable=True),
+    sa.Column('chan', sa.Integer(), nullable=True),
+    sa.Column('plate_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('timepoint_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.ForeignKeyConstraint(['plate_id'], ['plate.id'], ),
+    sa.ForeignKeyConstraint(['timepoint_id'], ['timepoint.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_item_id'), ['id'], unique=False)
+
+    op.create_table('item_tag_assoc',
+    sa.Column('item_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('tag_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ),
+    sa.PrimaryKeyConstraint('item_id', 'tag_id'),
+    sa.UniqueConstraint('item_id', 'tag_id')
+    )
+    with op.batch_alter_table('item_tag_assoc', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_item_tag_assoc_item_id'), ['item_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_tag_assoc_tag_id'), ['tag_id'], unique=False)
+
+
+
+def downgrade():
+    with op.batch_alter_table('item_tag_assoc', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_item_tag_assoc_tag_id'))
+        batch_op.drop_index(batch_op.f('ix_item_tag_assoc_item_id'))
+
+    op.drop_table('item_tag_assoc')
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_item_id'))
+
+    op.drop_table('item')
+    with op.batch_alter_table('timepoint', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_timepoint_id'))
+
+    op.drop_table('timepoint')
+    with op.batch_alter_table('section', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_section_id'))
+
+    op.drop_table('section')
+    with op.batch_alter_table('stack_modality_assoc', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stack_modality_assoc_stack_id'))
+        batch_op.drop_index(batch_op.f('ix_stack_modality_assoc_modality_id'))
+
+    op.drop_table('stack_modality_assoc')
+    with op.batch_alter_table('plate', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_plate_id'))
+
+    op.drop_table('plate')
+    with op.batch_alter_table('compound', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_compound_id'))
+
+    op.drop_table('compound')
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tag_id'))
+
+    op.drop_table('tag')
+    with op.batch_alter_table('stack', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stack_id'))
+
+    op.drop_table('stack')
+    with op.batch_alter_table('modality', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_modality_id'))
+
+    op.drop_table('modality')
+    with op.batch_alter_table('compound_property', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_compound_property_rgt'))
+        batch_op.drop_index(batch_op.f('ix_compound_property_lft'))
+        batch_op.drop_index(batch_op.f('ix_compound_property_level'))
+        batch_op.drop_index(batch_op.f('ix_compound_property_id'))
+
+    op.drop_table('compound_property')
+    with op.batch_alter_table('cell', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cell_id'))
+
+    op.drop_table('cell')
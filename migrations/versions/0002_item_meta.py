@@ -0,0 +1,81 @@
+"""Denormalized item_meta table for item listings
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 13:55:11.547224
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # The table may exist where db.create_all() ran on the new models.
+    if 'item_meta' in _tables():
+        return
+
+    op.create_table('item_meta',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('uri', sa.String(length=300), nullable=True),
+    sa.Column('row', sa.String(length=1), nullable=True),
+    sa.Column('col', sa.Integer(), nullable=True),
+    sa.Column('site', sa.Integer(), nullable=True),
+    sa.Column('chan', sa.Integer(), nullable=True),
+    sa.Column('missing', sa.Boolean(), nullable=True),
+    sa.Column('plate_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('plate_name', sa.String(length=100), nullable=True),
+    sa.Column('cell_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('cell_name', sa.String(length=100), nullable=True),
+    sa.Column('cell_code', sa.String(length=100), nullable=True),
+    sa.Column('stack_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('stack', sa.String(length=100), nullable=True),
+    sa.Column('modality_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('modality_name', sa.String(length=100), nullable=True),
+    sa.Column('modality_target', sa.String(length=100), nullable=True),
+    sa.Column('compound_concentration', sa.Float(), nullable=True),
+    sa.Column('compound_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('compound_name', sa.String(length=100), nullable=True),
+    sa.Column('compound_property_id', sa.Integer(), nullable=True),
+    sa.Column('timepoint_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('timepoint_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('section_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('tags', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('item_meta', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_item_meta_cell_id'), ['cell_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_compound_id'), ['compound_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_compound_property_id'), ['compound_property_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_modality_id'), ['modality_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_plate_id'), ['plate_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_section_id'), ['section_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_stack_id'), ['stack_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_item_meta_timepoint_id'), ['timepoint_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('item_meta', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_item_meta_timepoint_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_stack_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_section_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_plate_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_modality_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_compound_property_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_compound_id'))
+        batch_op.drop_index(batch_op.f('ix_item_meta_cell_id'))
+
+    op.drop_table('item_meta')
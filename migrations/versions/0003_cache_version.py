@@ -0,0 +1,37 @@
+"""Version stamps of cached data
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 13:56:02.118540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # The table may exist where db.create_all() ran on the new models.
+    if 'cache_version' in _tables():
+        return
+
+    op.create_table('cache_version',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('cache_version')
@@ -0,0 +1,51 @@
+"""Background ingestion jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 13:56:47.902311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # The table may exist where db.create_all() ran on the new models.
+    if 'job' in _tables():
+        return
+
+    op.create_table('job',
+    sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'running', 'done', 'failed', name='jobstatus'), nullable=False),
+    sa.Column('uri', sa.String(length=300), nullable=True),
+    sa.Column('plate_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('timepoint_id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+    sa.Column('n_items', sa.Integer(), nullable=False),
+    sa.Column('created', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('started', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_id'), ['id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_id'))
+
+    op.drop_table('job')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
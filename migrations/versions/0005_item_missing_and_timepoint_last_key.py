@@ -0,0 +1,39 @@
+"""Missing items and last listed key of timepoints, for incremental re-scans
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 13:55:11.547224
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # Columns may exist where db.create_all() ran on the new models.
+    if 'missing' not in _columns('item'):
+        with op.batch_alter_table('item', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('missing', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    if 'last_key' not in _columns('timepoint'):
+        with op.batch_alter_table('timepoint', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('last_key', sa.String(length=300), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('timepoint', schema=None) as batch_op:
+        batch_op.drop_column('last_key')
+
+    with op.batch_alter_table('item', schema=None) as batch_op:
+        batch_op.drop_column('missing')
@@ -0,0 +1,47 @@
+"""Composite indexes for item listings and section lookups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 14:10:42.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+indexes = {
+    'item': {
+        'ix_item_plate_timepoint_chan_well': ['plate_id', 'timepoint_id', 'chan', 'row', 'col', 'site'],
+        'ix_item_timepoint_uri': ['timepoint_id', 'uri'],
+    },
+    'item_meta': {
+        'ix_item_meta_listing_order': ['timepoint_time', 'row', 'col', 'site', 'chan', 'id'],
+        'ix_item_meta_plate_timepoint_chan': ['plate_id', 'timepoint_id', 'chan'],
+    },
+    'section': {
+        'ix_section_plate_wells': ['plate_id', 'row_start', 'row_end', 'col_start', 'col_end'],
+    },
+}
+
+
+def upgrade():
+    # Indexes may already exist where db.create_all() ran on the new models.
+    inspector = sa.inspect(op.get_bind())
+    for table, columns_of in indexes.items():
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        for name, columns in columns_of.items():
+            if name not in existing:
+                op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for table, columns_of in indexes.items():
+        for name in columns_of:
+            op.drop_index(name, table_name=table)
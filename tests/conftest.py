@@ -17,7 +17,7 @@ class TestClient(testing.FlaskClient):
 @pytest.fixture()
 def app():
     from app.api.v1 import register_api_blueprints
-    from app.extensions import db, ma, parser, restapi
+    from app.extensions import db, jobs, ma, parser, restapi, thumbnails
 
     app = Flask(__name__, instance_relative_config=False)
 
@@ -30,7 +30,10 @@ def app():
 
         db.init_app(app)
         ma.init_app(app)
-        parser.init_app(app, TestReader())
+        reader = TestReader()
+        parser.init_app(app, reader)
+        jobs.init_app(app)
+        thumbnails.init_app(app, reader)
 
         register_api_blueprints(app)
         restapi.init_app(app)
@@ -98,3 +98,40 @@ def test_create_property_non_existing_parent(client):
                                       'parent_id': 999}
     )
     assert prop == 404
+
+
+def test_property_cache_reloads_on_version_change(app):
+    from app import db
+    from app.cache import bump_version
+    from app.extensions import property_cache
+    from app.models import CompoundProperty
+
+    assert property_cache.get().descendants("target", "t9") is None
+
+    # write from another process
+    db.session.add(CompoundProperty(value="t9", parent_id=3, type="target"))
+    db.session.commit()
+    assert property_cache.get().descendants("target", "t9") is None
+
+    bump_version(db, property_cache.name)
+    db.session.commit()
+    snapshot = property_cache.get()
+    t9 = snapshot.descendants("target", "t9")
+    assert len(t9) == 1
+    assert t9[0] in snapshot.descendants("moa_group", "g1")
+    assert snapshot.ancestors[t9[0]] == [
+        ("moa_group", "g1"), ("moa_subgroup", "sg3"), ("target", "t9")
+    ]
+
+
+def test_filter_items_by_new_property(client):
+    prop = client.post(
+        "compound-properties/", json={"type": "target", "value": "atarget",
+                                      'parent_id': 3}
+    )
+    compound_id = client.get("compounds/").json[0]["id"]
+    client.patch(f"compounds/{compound_id}", json={"property_id": prop.json["id"]})
+
+    items = client.get("items/?compound_target=atarget").json
+    assert len(items) > 0
+    assert all([i['compound_moa_subgroup'] == 'sg3' for i in items])
@@ -1,3 +1,9 @@
+import base64
+import csv
+import io
+import json
+import pytest
+import uuid
 from urllib.parse import urlencode
 
 def test_get_section_timepoint(client):
@@ -22,6 +28,38 @@ def test_get_image_by_tag(client):
     assert all(['tag_0' not in r['tags'] for r in res.json])
 
 
+@pytest.mark.parametrize("meta", [False, True])
+def test_filter_by_tags(client, request, meta):
+    if meta:
+        request.getfixturevalue("item_meta")
+
+    def ids(query):
+        return {i['id'] for i in client.get(f"items/?{query}").json}
+
+    all_items = ids("")
+    tag_1 = ids("tags=tag_1")
+    assert tag_1 and tag_1 != all_items
+
+    assert ids("tags_any=tag_0&tags_any=tag_1") == all_items
+    assert ids("tags_all=tag_1&tags_all=tag_2") == tag_1
+    assert ids("tags_all=tag_0&tags_all=tag_1") == set()
+    assert ids("tags_none=tag_0") == tag_1
+    assert ids("tags_any=tag_0&tags_none=tag_0") == set()
+
+
+def test_filter_by_tag_with_regexp_characters(client):
+    client.post("tags/", json={"name": "a.b+"})
+    client.post("tags/", json={"name": "aab"})
+    plate_id = client.get('plates/').json[0]['id']
+    timepoint_id = client.get(f'plates/{plate_id}/timepoints').json[0]['id']
+    client.post(f"items/tag/aab?timepoint_id={timepoint_id}")
+
+    assert client.get("items/?tags=a.b%2B").json == []
+    client.post(f"items/tag/a.b%2B?timepoint_id={timepoint_id}")
+    items = client.get("items/?tags=a.b%2B").json
+    assert items and all(i['timepoint_id'] == timepoint_id for i in items)
+
+
 def test_get_image_by_id(client):
     res = client.get("items/")
     item_id = res.json[0]['id']
@@ -115,3 +153,335 @@ def test_untag(client):
     assert 'newtag' not in image_after['tags']
 
 
+
+
+@pytest.fixture()
+def item_meta(app):
+    from app import db
+    from app.api.v1.item import refresh_item_meta
+
+    app.config["ITEM_META_TABLE"] = True
+    refresh_item_meta()
+    db.session.commit()
+    yield
+    app.config["ITEM_META_TABLE"] = False
+
+
+def _by_id(items):
+    return {i['id']: {k: v for k, v in i.items() if k != 'tags'} for i in items}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {'compound_moa_group': 'g1'},
+        {'compound_moa_subgroup': 'sg3'},
+        {'compound_name': 'compound_1'},
+        {'tags': 'tag_1'},
+        {'row': 'B', 'chan': 2},
+        {'stack_name': 'stack_0'},
+    ],
+)
+def test_item_meta_matches_join(app, client, params):
+    expected = client.get("items/?{}".format(urlencode(params))).json
+
+    from app.api.v1.item import refresh_item_meta
+
+    app.config["ITEM_META_TABLE"] = True
+    refresh_item_meta()
+    res = client.get("items/?{}".format(urlencode(params))).json
+
+    assert len(res) == len(expected) > 0
+    assert _by_id(res) == _by_id(expected)
+
+
+def test_item_meta_follows_section_update(client, item_meta):
+    plate_id = client.get('plates/').json[0]['id']
+    section_id = client.get(f'plates/{plate_id}/sections').json[0]['id']
+    client.patch(f"sections/{section_id}", json={"compound_name": "compound_2"})
+
+    items = client.get("items/?{}".format(urlencode({'section_id': section_id}))).json
+    assert len(items) > 0
+    assert all([i['compound_name'] == 'compound_2' for i in items])
+
+
+def test_item_meta_follows_tagging(client, item_meta):
+    plate_id = client.get('plates/').json[0]['id']
+    section_id = client.get(f'plates/{plate_id}/sections').json[0]['id']
+    params = urlencode({'section_id': section_id})
+    client.post("items/tag/tag_3?{}".format(params))
+
+    items = client.get("items/?{}".format(params)).json
+    assert all(['tag_3' in i['tags'] for i in items])
+
+
+@pytest.mark.parametrize("meta", [False, True])
+def test_retag_is_idempotent(client, request, meta):
+    if meta:
+        request.getfixturevalue("item_meta")
+    plate_id = client.get('plates/').json[0]['id']
+    params = urlencode({'plate_id': plate_id})
+
+    client.post("items/tag/tag_3?{}".format(urlencode({'row': 'A'})))
+    res = client.post("items/tag/tag_3?{}".format(params))
+    assert res.status_code == 200
+    items = client.get("items/?{}".format(params)).json
+    assert all([i['tags'].split(',').count('tag_3') == 1 for i in items])
+
+
+def test_item_meta_follows_untagging_by_tag(client, item_meta):
+    params = urlencode({'tags_any': 'tag_1'})
+    assert len(client.get("items/?{}".format(params)).json) > 0
+
+    from sqlalchemy import event
+    from app import db
+
+    n_parameters = []
+    def record(conn, cursor, statement, parameters, *args):
+        n_parameters.append(len(parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    res = client.delete("items/tag/tag_1?{}".format(params))
+    event.remove(db.engine, "before_cursor_execute", record)
+    assert res.status_code == 200
+    # ids of items are not sent back to the database
+    assert max(n_parameters) < 10
+    assert client.get("items/?{}".format(params)).json == []
+    items = client.get("items/").json
+    assert not any(['tag_1' in (i['tags'] or '').split(',') for i in items])
+
+
+def test_item_meta_follows_timepoint_delete(client, item_meta):
+    id = client.get('timepoints/').json[0]['id']
+    client.delete(f'timepoints/{id}')
+
+    items = client.get('items/').json
+    assert len(items) > 0
+    assert not any([item['timepoint_id'] == id for item in items])
+
+
+@pytest.mark.parametrize("params", [{}, {'chan': 2, 'compound_name': 'compound_0'}])
+def test_cursor_pagination_matches_listing(client, params):
+    expected = [i['id'] for i in client.get("items/?{}".format(urlencode(params))).json]
+
+    ids = []
+    after = ''
+    while after is not None:
+        res = client.get("items/?{}".format(urlencode({**params, 'after': after, 'page_size': 25})))
+        assert res == 200
+        ids += [i['id'] for i in res.json]
+        after = json.loads(res.headers['X-Pagination']).get('next_after')
+
+    assert ids == expected
+
+
+def test_cursor_pagination_count(client):
+    res = client.get("items/?{}".format(urlencode({'after': '', 'count': 'true'})))
+    metadata = json.loads(res.headers['X-Pagination'])
+    assert metadata['total'] == len(client.get("items/").json)
+
+
+@pytest.mark.parametrize(
+    "count_mode, used", [(None, "exact"), ("cached", "cached"), ("estimated", "exact")]
+)
+def test_count_mode(client, count_mode, used):
+    params = {'chan': 2} if count_mode is None else {'chan': 2, 'count_mode': count_mode}
+    res = client.get("items/?{}".format(urlencode(params)))
+    metadata = json.loads(res.headers['X-Pagination'])
+    assert metadata['count_mode'] == used
+    assert metadata['total'] == len(res.json) > 0
+
+
+def test_cached_count_is_invalidated_by_writes(app, client):
+    from app import db
+    from app import models as mdl
+
+    params = urlencode({'count_mode': 'cached'})
+    total = json.loads(client.get(f"items/?{params}").headers['X-Pagination'])['total']
+
+    item = db.session.get(mdl.Item, uuid.UUID(client.get("items/").json[0]['id']))
+    db.session.query(mdl.ItemTagAssociation).filter_by(item_id=item.id).delete()
+    db.session.delete(item)
+    db.session.commit()
+    metadata = json.loads(client.get(f"items/?{params}").headers['X-Pagination'])
+    assert metadata['total'] == total
+
+    client.post("items/tag/tag_3?{}".format(urlencode({'row': 'A'})))
+    metadata = json.loads(client.get(f"items/?{params}").headers['X-Pagination'])
+    assert metadata['total'] == total - 1
+
+
+def test_count_version_is_bumped_after_commit(app):
+    from app import db
+    from app.cache import bump_version, get_version
+    from app.extensions import item_counts
+
+    version = get_version(db, "item_count")
+    item_counts.invalidate()
+    assert get_version(db, "item_count") == version
+    db.session.rollback()
+    assert get_version(db, "item_count") == version
+
+    item_counts.invalidate()
+    item_counts.invalidate()
+    db.session.commit()
+    assert get_version(db, "item_count") == version + 1
+
+    # first bumps of a resource do not conflict
+    bump_version(db, "new_resource")
+    bump_version(db, "new_resource")
+    assert get_version(db, "new_resource") == 2
+
+
+def test_estimated_count_explains_query(app):
+    from sqlalchemy.dialects import postgresql
+
+    from app.api.v1.item import get_items_with_meta
+    from app.query_plans import Explain
+
+    statement = get_items_with_meta().statement
+    sql = str(Explain(statement).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+
+
+@pytest.mark.parametrize(
+    "keys", [5, ["2011-11-04T00:05:23", "A", 1, 1, 1], ["2011-11-04T00:05:23", 1, "A",
+             1, 1, "6b9e9d3c-0d3a-4c4b-9b7a-1d4f7b2c1a10"], [None] * 6]
+)
+def test_cursor_pagination_bad_cursor(client, keys):
+    res = client.get("items/?after=notacursor")
+    assert res == 422
+
+    cursor = base64.urlsafe_b64encode(json.dumps(keys).encode()).decode()
+    res = client.get("items/?{}".format(urlencode({'after': cursor})))
+    assert res == 422
+
+
+def test_cursor_pagination_total_is_the_same_for_all_pages(client):
+    params = {'after': '', 'count': 'true', 'page_size': 10}
+    res = client.get("items/?{}".format(urlencode(params)))
+    first = json.loads(res.headers['X-Pagination'])
+
+    params['after'] = first['next_after']
+    res = client.get("items/?{}".format(urlencode(params)))
+    second = json.loads(res.headers['X-Pagination'])
+    assert first['total'] == second['total'] == len(client.get("items/").json)
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv", "parquet", "arrow"])
+def test_export(client, format):
+    params = {'compound_name': 'compound_0', 'chan': 1}
+    expected = {i['id'] for i in client.get("items/?{}".format(urlencode(params))).json}
+
+    res = client.get("items/export?{}".format(urlencode({**params, 'format': format, 'chunk_size': 7})))
+    assert res == 200
+
+    if format == 'ndjson':
+        ids = {json.loads(line)['id'] for line in res.data.decode().splitlines()}
+    elif format == 'csv':
+        ids = {r['id'] for r in csv.DictReader(io.StringIO(res.data.decode()))}
+    else:
+        pa = pytest.importorskip('pyarrow')
+        if format == 'arrow':
+            table = pa.ipc.open_stream(res.data).read_all()
+        else:
+            import pyarrow.parquet as pq
+            table = pq.read_table(pa.BufferReader(res.data))
+        ids = set(table.column('id').to_pylist())
+
+    assert ids == expected
+
+
+def test_dump_many_does_not_query_per_item(app):
+    from sqlalchemy import event
+    from app import db
+    from app.api.v1.item import get_items_with_meta
+    from app.schemas import ItemSchema
+
+    items = get_items_with_meta().all()
+    ItemSchema(many=True).dump(items[:1])
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    dumped = ItemSchema(many=True).dump(items)
+    event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert len(dumped) > 100
+    assert len(statements) == 1
+    assert all(['compound_moa_group' in d for d in dumped])
+
+
+def test_filters_share_compiled_statement(app):
+    from sqlalchemy import event
+    from sqlalchemy.engine.default import CACHE_HIT
+    from app import db
+    from app import models as mdl
+    from app.api.v1.item import apply_query_args, filter_columns, get_items_with_meta
+
+    assert filter_columns()["plate_name"] is mdl.Plate.name
+    assert filter_columns()["row"] is mdl.Item.row
+
+    cache_hits = []
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        cache_hits.append(context.cache_hit is CACHE_HIT)
+
+    plate_name = mdl.Plate.query.first().name
+    event.listen(db.engine, "after_cursor_execute", after_execute)
+    try:
+        counts = []
+        for row, moa_group in [("A", "g1"), ("B", "g1")]:
+            cache_hits.clear()
+            args = {"row": row, "plate_name": plate_name, "compound_moa_group": moa_group}
+            counts.append(apply_query_args(db, get_items_with_meta(), args).count())
+    finally:
+        event.remove(db.engine, "after_cursor_execute", after_execute)
+
+    assert all(counts)
+    assert cache_hits[-1]
+
+
+def test_representative_queries_use_indexes(app):
+    from app import db
+    from app.query_plans import explain, representative_queries
+
+    queries = representative_queries(db)
+    assert set(queries) == {"all", "plate", "timepoint", "channel", "wells"}
+    results = {name: explain(db, query) for name, query in queries.items()}
+    assert "item" in results["all"]["scans"]
+    assert "item" not in results["channel"]["scans"]
+
+
+def test_find_regressions():
+    from app.query_plans import find_regressions
+
+    baseline = {"a": {"time_ms": 10.0, "scans": []}, "b": {"time_ms": 100.0, "scans": []}}
+    results = {
+        "a": {"time_ms": 14.0, "scans": ["item"]},
+        "b": {"time_ms": 200.0, "scans": []},
+        "c": {"time_ms": 1000.0, "scans": ["item"]},
+    }
+    assert find_regressions(results, baseline) == [
+        "a: now scans item",
+        "b: 200.0ms, was 100.0ms",
+    ]
+
+
+def test_explain_command(app, tmp_path):
+    from app.commands import queries_cli
+
+    app.cli.add_command(queries_cli)
+    runner = app.test_cli_runner()
+    baseline = tmp_path / "baseline.json"
+    res = runner.invoke(args=["queries", "explain", "--save", str(baseline)])
+    assert res.exit_code == 0, res.output
+    assert set(json.loads(baseline.read_text())) == {
+        "all", "plate", "timepoint", "channel", "wells"
+    }
+
+    results = json.loads(baseline.read_text())
+    results["all"]["scans"] = []
+    baseline.write_text(json.dumps(results))
+    res = runner.invoke(args=["queries", "explain", "--baseline", str(baseline)])
+    assert res.exit_code == 1
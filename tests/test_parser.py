@@ -22,4 +22,86 @@ def test_parser_throws_exception(app, client):
         ep = f'plates/{plate_id}/timepoints'
         res = client.post(ep,
                           json={'uri': 'scheme://bucket/exp/'})
-        assert res == 400
+        assert res == 202
+        assert res.json['status'] == 'failed'
+        assert 'ParsingException' in res.json['error']
+
+        timepoints = client.get(ep).json
+        assert all([t['uri'] != 'scheme://bucket/exp/' for t in timepoints])
+
+
+def test_compiled_patterns_match_separate_expressions():
+    from app.config import Config
+    from app.parser import CompiledPatterns
+
+    patterns = CompiledPatterns(
+        tuple(Config.ADDITIONAL_REGEXP.items()),
+        Config.IGNORE_REGEXP,
+        Config.VALID_REGEXP,
+    )
+    uris = [
+        "s3://bucket/exp/file_B07_w2_s3_exp.tiff",
+        "s3://bucket/exp/file_B07_w2_s3_thumb.tiff",
+        "s3://bucket/exp/file_B07_w2_s3_exp.txt",
+        "s3://bucket/exp/file_nowell.tif",
+    ]
+    records = [patterns(uri) for uri in uris]
+
+    assert records[0] == {"uri": uris[0], "row": "B", "col": "07", "site": "3", "chan": "2"}
+    assert records[1] is None
+    assert records[2] is None
+    assert records[3] == {"uri": uris[3], "row": None, "col": None, "site": None, "chan": None}
+
+
+def test_compiled_patterns_with_groups_in_filters():
+    from app.config import Config
+    from app.parser import CompiledPatterns
+
+    patterns = CompiledPatterns(
+        tuple(Config.ADDITIONAL_REGEXP.items()),
+        r"^.*_(thumb|mask).*$",
+        r"^.*\.(tiff?|png)$",
+    )
+
+    assert patterns("s3://bucket/exp/file_B07_w2_s3_exp.png") == {
+        "uri": "s3://bucket/exp/file_B07_w2_s3_exp.png",
+        "row": "B", "col": "07", "site": "3", "chan": "2",
+    }
+    assert patterns("s3://bucket/exp/file_B07_w2_s3_mask.tiff") is None
+    assert patterns("s3://bucket/exp/file_B07_w2_s3_exp.txt") is None
+
+
+def test_parser_streams_listing():
+    from app.parser import Parser
+    from app.reader.test import TestReader
+
+    records = Parser(TestReader()).iter("scheme://project/exp1/tp1/", valid_rex=r"^.*\.tiff$")
+    assert next(records)["uri"].startswith("scheme://project/exp1/tp1/")
+
+
+def test_expressions_that_cannot_be_combined():
+    from app.config import Config
+    from app.parser import CompiledPatterns, SeparatePatterns, compile_patterns
+
+    additional_rex = tuple(Config.ADDITIONAL_REGEXP.items())
+    assert isinstance(
+        compile_patterns(additional_rex, Config.IGNORE_REGEXP, Config.VALID_REGEXP),
+        CompiledPatterns,
+    )
+
+    uri = "s3://bucket/exp/FILE_B07_w2_s3_exp.TIFF"
+    for extra_rex, ignore_rex, valid_rex in [
+        # backreference by number: same experiment name twice
+        ((("exp", r"/(\w+)/\w+_\w+_\w+_\w+_\1\."),), "$^", r"(?i)^.*\.tiff?$"),
+        # group name used by two expressions
+        ((("row", r"_(?P<well>[A-P])\d{2}_"),), r"^.*_(?P<well>thumb)", r"^.*\.TIFF$"),
+    ]:
+        patterns = compile_patterns(extra_rex, ignore_rex, valid_rex)
+        assert isinstance(patterns, SeparatePatterns)
+        record = patterns(uri)
+        assert record is not None
+        assert record[extra_rex[0][0]] in ("exp", "B")
+
+    patterns = compile_patterns((), r"(?i)^.*_thumb", ".*")
+    assert patterns("s3://bucket/exp/file_B07_THUMB.tiff") is None
+    assert patterns("s3://bucket/exp/file_B07.tiff") == {"uri": "s3://bucket/exp/file_B07.tiff"}
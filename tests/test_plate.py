@@ -72,3 +72,60 @@ def test_get_stack(client):
     res = client.get('plates/')
     res = client.get(res.json[0]['_links']['stack'])
     assert res == 200
+
+
+def test_import_layout(client):
+    plate_id = client.get("plates/").json[0]['id']
+    layout = [
+        {"row_start": "C", "row_end": "C", "col_start": c, "col_end": c,
+         "cell_code": "cell_code_0", "compound_name": f"compound_{c % 3}",
+         "compound_concentration": c / 10}
+        for c in range(12)
+    ]
+
+    res = client.post(f"plates/{plate_id}/layout", json=layout)
+    assert res == 201
+    assert len(res.json) == 12
+    assert len(client.get(f"plates/{plate_id}/sections").json) == 14
+
+    # overlaps with the sections just added
+    res = client.post(f"plates/{plate_id}/layout", json=layout[:2])
+    assert res == 409
+    assert len(res.json["errors"]) == 2
+
+
+def test_import_layout_csv(client):
+    plate_id = client.get("plates/").json[0]['id']
+    table = "\n".join([
+        "row_start,row_end,col_start,col_end,cell_code,compound_name,compound_concentration",
+        "A,B,0,5,cell_code_0,compound_0,0.1",
+        "A,B,6,11,cell_code_0,compound_1,",
+        "C,C,0,11,cell_code_0,compound_2,1",
+    ])
+
+    res = client.post(f"plates/{plate_id}/layout?replace=true", data=table,
+                      content_type="text/csv")
+    assert res == 201
+    sections = client.get(f"plates/{plate_id}/sections").json
+    assert sorted((s["row_start"], s["col_start"]) for s in sections) == [
+        ("A", 0), ("A", 6), ("C", 0)]
+
+
+@pytest.mark.parametrize("field,value,status", [
+    ("cell_code", "unknown", 404),
+    ("compound_name", "unknown", 404),
+    ("col_start", "x", 422),
+    ("col_start", 5, 422),
+    ("row_start", "D", 422),
+    ("col_end", 999, 409),
+    ("row_end", "Z", 409),
+])
+def test_import_layout_bad_inputs(client, field, value, status):
+    plate_id = client.get("plates/").json[0]['id']
+    section = {"row_start": "C", "row_end": "C", "col_start": 0, "col_end": 1,
+               "cell_code": "cell_code_0", "compound_name": "compound_0"}
+    section[field] = value
+
+    res = client.post(f"plates/{plate_id}/layout", json=[section])
+    assert res == status
+    assert len(client.get(f"plates/{plate_id}/sections").json) == 2
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture()
+def bucket(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+    with moto.mock_s3():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket="bucket")
+        keys = [
+            f"exp/tp1/file_{row}{col:02d}_w{chan}_s{site}_exp.tiff"
+            for row in "ABCDEFGH"
+            for col in range(12)
+            for chan in range(1, 4)
+            for site in range(2)
+        ]
+        for k in keys + ["exp/tp1/sub/file_A01_w1_s0_exp.tiff",
+                         "exp/tp2/file_A01_w1_s0_exp.tiff"]:
+            client.put_object(Bucket="bucket", Key=k, Body=b"")
+
+        yield ["s3://bucket/" + k for k in keys]
+
+
+@pytest.mark.parametrize("list_workers", [1, 4])
+def test_list(bucket, list_workers):
+    from app.reader.s3 import S3Reader
+
+    reader = S3Reader(list_workers=list_workers, list_page_size=50)
+    uris = list(reader.list("s3://bucket/exp/tp1/"))
+
+    assert len(uris) == len(bucket)
+    assert set(uris) == set(bucket)
+
+
+def test_list_stops_early(bucket):
+    from app.reader.s3 import S3Reader
+
+    reader = S3Reader(list_workers=4, list_page_size=10)
+    uris = reader.list("s3://bucket/exp/tp1/")
+    first = [next(uris) for _ in range(30)]
+    uris.close()
+
+    assert len(set(first)) == 30
+
+
+def test_list_raises_partition_errors(bucket, monkeypatch):
+    from botocore.exceptions import EndpointConnectionError
+    from app.reader.s3 import S3Reader
+
+    list_pages = S3Reader._list_pages
+
+    def failing_list_pages(self, uri, start_after=None, stop_at=None):
+        if stop_at is None:
+            raise EndpointConnectionError(endpoint_url="https://s3.amazonaws.com")
+        yield from list_pages(self, uri, start_after, stop_at)
+
+    monkeypatch.setattr(S3Reader, "_list_pages", failing_list_pages)
+    reader = S3Reader(list_workers=4, list_page_size=50)
+
+    with pytest.raises(EndpointConnectionError):
+        list(reader.list("s3://bucket/exp/tp1/"))
+
+
+def test_list_balances_partitions(bucket, monkeypatch):
+    from app.reader.s3 import S3Reader
+
+    list_pages = S3Reader._list_pages
+    partition_sizes = []
+
+    def counting_list_pages(self, uri, start_after=None, stop_at=None):
+        partition_sizes.append(0)
+        i = len(partition_sizes) - 1
+        for keys, more in list_pages(self, uri, start_after, stop_at):
+            partition_sizes[i] += len(keys)
+            yield keys, more
+
+    monkeypatch.setattr(S3Reader, "_list_pages", counting_list_pages)
+    reader = S3Reader(list_workers=4, list_page_size=50)
+    uris = list(reader.list("s3://bucket/exp/tp1/"))
+
+    assert sorted(uris) == sorted(bucket)
+    # partitions bigger than a page are split again
+    assert max(partition_sizes) <= 2 * 50
+
+
+def test_make_partitions_cover_rows():
+    from app.reader.s3 import make_partitions
+
+    partitions = make_partitions(["exp/file_A01_w1", "exp/file_A02_w1"],
+                                 max_partitions=1000)
+    start_afters = [p[0] for p in partitions]
+
+    assert partitions[0][0] == "exp/file_A02_w1"
+    assert partitions[-1][1] is None
+    assert "exp/file_B" in start_afters
+    assert all(a < b for a, b in zip(start_afters, start_afters[1:]))
+
+    partitions = make_partitions(["exp/file_A01_w1", "exp/file_A02_w1"], max_partitions=4,
+                                 stop_at="exp/file_C")
+    assert all(a < "exp/file_C" for a, _ in partitions)
+    assert partitions[-1][1] == "exp/file_C"
+
+
+def test_make_partitions_balance():
+    import bisect
+    from app.reader.s3 import make_partitions
+
+    # 16x24 plate, 80 files per well, listed by pages of 1000
+    keys = sorted(
+        f"exp/tp1/file_{row}{col:02d}_w{i % 4}_s{i // 4:02d}.tiff"
+        for row in "ABCDEFGHIJKLMNOP"
+        for col in range(1, 25)
+        for i in range(80)
+    )
+    partitions = make_partitions(keys[:1000], max_partitions=16)
+    sizes = [
+        (len(keys) if stop_at is None else bisect.bisect_right(keys, stop_at))
+        - bisect.bisect_right(keys, start_after)
+        for start_after, stop_at in partitions
+    ]
+
+    assert len(partitions) == 16
+    assert sum(sizes) == len(keys) - 1000
+    assert max(sizes) < len(keys) / 4
+    assert sum(size > 0 for size in sizes) >= 8
+
+
+def test_etag_changes_with_content(bucket):
+    from app.reader.s3 import S3Reader
+
+    reader = S3Reader(list_workers=1)
+    etag = reader.etag(bucket[0])
+    assert etag == reader.etag(bucket[0])
+
+    boto3.client("s3").put_object(Bucket="bucket", Key=bucket[0][12:], Body=b"new")
+    assert reader.etag(bucket[0]) != etag
+
+
+def test_etags(bucket):
+    from app.reader.s3 import S3Reader
+
+    reader = S3Reader(list_workers=1, read_workers=2)
+    uris = bucket[:5]
+
+    assert list(reader.etags(uris)) == [(uri, reader.etag(uri)) for uri in uris]
+
+
+def test_shared_client(bucket):
+    from app.reader.s3 import S3Reader
+
+    reader = S3Reader(list_workers=1, max_pool_connections=4, max_attempts=2)
+    assert reader.client.meta.config.max_pool_connections == 4
+
+    reader.etag(bucket[0])
+    reader.etag(bucket[1])
+    stats = reader.stats()
+    assert stats["requests"] == 2
+    assert stats["reused"] == stats["requests"] - stats["connections"]
+
+
+def test_connection_stats_without_botocore_internals(bucket, monkeypatch):
+    from app.reader.s3 import S3Reader
+
+    reader = S3Reader(list_workers=1)
+    reader.etag(bucket[0])
+    monkeypatch.delattr(reader.client._endpoint, "http_session")
+
+    assert reader.stats() == {"requests": 1, "connections": None, "reused": None}
+
+
+@pytest.mark.parametrize("decode_workers", [0, 1])
+@pytest.mark.parametrize("ordered", [True, False])
+def test_read_many(bucket, ordered, decode_workers):
+    import io
+    import numpy as np
+    from PIL import Image
+    from app.reader.s3 import S3Reader
+
+    client = boto3.client("s3")
+    uris = bucket[:6]
+    for i, uri in enumerate(uris):
+        buffer = io.BytesIO()
+        Image.fromarray(np.full((16, 16), i, dtype=np.uint8)).save(buffer, format="TIFF")
+        client.put_object(Bucket="bucket", Key=uri[12:], Body=buffer.getvalue())
+
+    reader = S3Reader(size=(4, 4), list_workers=1, read_workers=2,
+                      decode_workers=decode_workers)
+    results = list(reader.read_many(uris, ordered=ordered))
+
+    if ordered:
+        assert [uri for uri, _ in results] == uris
+    assert {uri: image.mean() for uri, image in results} == {
+        uri: i for i, uri in enumerate(uris)
+    }
+    assert all(image.shape == (4, 4) for _, image in results)
+    assert all(image.dtype == np.uint8 for _, image in results)
+
+
+def test_read_concurrently_bounds_pending():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.reader.base import read_concurrently
+
+    submitted = []
+
+    def uris():
+        for i in range(100):
+            submitted.append(i)
+            yield i
+
+    with ThreadPoolExecutor(2) as threads:
+        results = read_concurrently(uris(), lambda x: x * 2, threads, max_pending=4)
+        assert next(results) == (0, 0)
+        assert len(submitted) <= 5
+        assert [r for _, r in results] == [2 * i for i in range(1, 100)]
+
+
+def test_read_concurrently_returns_exceptions():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.reader.base import read_concurrently
+
+    def fetch(i):
+        if i == 2:
+            raise ValueError(i)
+        return i
+
+    with ThreadPoolExecutor(2) as threads:
+        results = dict(read_concurrently(range(5), fetch, threads, return_exceptions=True))
+        assert isinstance(results.pop(2), ValueError)
+        assert results == {0: 0, 1: 1, 3: 3, 4: 4}
+
+        with pytest.raises(ValueError):
+            list(read_concurrently(range(5), fetch, threads))
@@ -1,4 +1,8 @@
 #!/usr/bin/env python3
+import uuid
+from urllib.parse import urlencode
+
+import pytest
 
 
 def test_update_section(client):
@@ -25,14 +29,21 @@ def test_update_wrong_id(client):
     assert res == 404
 
 
+def test_update_unknown_section(client):
+    res = client.patch(
+        f"sections/{uuid.uuid4()}", json={"compound_name": "compound_0"}
+    )
+    assert res == 404
+
+
 def test_create_section(client):
     """
     Add section in available row
     """
     plate_id = client.get("plates/").json[0]['id']
     section = client.get(f'plates/{plate_id}/sections').json[0]
-    section["row_start"] = "F"
-    section["row_end"] = "F"
+    section["row_start"] = "C"
+    section["row_end"] = "C"
     section.pop('id')
 
     res = client.post(f"plates/{plate_id}/sections", json=section)
@@ -69,6 +80,23 @@ def test_create_out_range(client):
     assert res == 409
 
 
+def test_create_out_of_column_range(client):
+    """
+    Add section in available rows but out of column bounds
+    """
+
+    plate_id = client.get("plates/").json[0]['id']
+    section = client.get(f'plates/{plate_id}/sections').json[0]
+    section["row_start"] = "C"
+    section["row_end"] = "C"
+    section["col_start"] = 90
+    section["col_end"] = 99
+    section.pop('id')
+
+    res = client.post(f"plates/{plate_id}/sections", json=section)
+    assert res == 409
+
+
 def test_delete(client):
     plate_id = client.get("plates/").json[0]['id']
     section = client.get(f'plates/{plate_id}/sections').json[0]
@@ -91,3 +119,111 @@ def test_update_not_exists(client):
         json={"compound_name": "asdf"},
     )
     assert res == 404
+
+
+def test_plate_extent(app):
+    from app import models as mdl
+    from app.api.v1.section import plate_extent
+
+    plate = mdl.Plate.query.first()
+    rows = [i.row for i in plate.items]
+    cols = [i.col for i in plate.items]
+
+    assert plate_extent(plate.id) == (min(rows), max(rows), min(cols), max(cols))
+    assert plate_extent(uuid.uuid4()) == (None,) * 4
+
+
+def test_find_overlaps():
+    from app.api.v1.section import find_overlaps
+
+    def section(rows, cols):
+        return dict(row_start=rows[0], row_end=rows[1], col_start=cols[0], col_end=cols[1])
+
+    sections = [
+        section("AB", (1, 6)),
+        section("AB", (7, 12)),
+        section("BC", (6, 7)),
+        section("DH", (1, 12)),
+        section("HH", (12, 12)),
+    ]
+    assert find_overlaps(sections) == [(0, 2), (1, 2), (3, 4)]
+
+
+def test_check_layout(app):
+    from werkzeug.exceptions import HTTPException
+    from app import models as mdl
+    from app.api.v1.section import check_layout
+
+    plate = mdl.Plate.query.first()
+    layout = [
+        dict(row_start="C", row_end="C", col_start=1, col_end=5),
+        dict(row_start="C", row_end="C", col_start=5, col_end=9),
+    ]
+
+    with pytest.raises(HTTPException) as e:
+        check_layout(plate.id, layout)
+    assert e.value.data["errors"] == [{"section": 0, "error": "overlaps section 1"}]
+
+    layout[1]["row_start"] = "A"
+    with pytest.raises(HTTPException) as e:
+        check_layout(plate.id, layout)
+    errors = e.value.data["errors"]
+    assert {"section": 1, "error": "overlaps existing section"} in errors
+    assert {"section": 0, "error": "overlaps section 1"} in errors
+
+    layout[1]["row_start"] = "C"
+    layout[1]["col_start"] = 6
+    check_layout(plate.id, layout)
+    check_layout(plate.id, [dict(row_start="A", row_end="B", col_start=1, col_end=9)],
+                 replace=True)
+    check_layout(plate.id, [dict(row_start="A", row_end="C", col_start=0, col_end=11)],
+                 replace=True)
+
+
+@pytest.mark.parametrize("section, error", [
+    (dict(row_start="A", row_end="Z", col_start=0, col_end=11), "out of bounds"),
+    (dict(row_start="A", row_end="C", col_start=0, col_end=999), "out of bounds"),
+    (dict(row_start="C", row_end="A", col_start=0, col_end=1), "start after end"),
+    (dict(row_start="A", row_end="A", col_start=5, col_end=1), "start after end"),
+])
+def test_check_layout_bounds(app, section, error):
+    from werkzeug.exceptions import HTTPException
+    from app import models as mdl
+    from app.api.v1.section import check_layout
+
+    plate = mdl.Plate.query.first()
+    with pytest.raises(HTTPException) as e:
+        check_layout(plate.id, [section], replace=True)
+    assert e.value.code == 409
+    assert e.value.data["errors"] == [{"section": 0, "error": error}]
+
+
+def test_section_writes_refresh_item_meta_of_their_wells(app, client):
+    from app import db
+    from app import models as mdl
+    from app.api.v1.item import refresh_item_meta
+
+    app.config["ITEM_META_TABLE"] = True
+    refresh_item_meta()
+    db.session.commit()
+    plate_id = client.get("plates/").json[0]['id']
+    section = client.get(f'plates/{plate_id}/sections').json[0]
+
+    # rows outside of the written section must be left as they are
+    outside = mdl.ItemMeta.query.filter(mdl.ItemMeta.col > section["col_end"])
+    assert outside.count() > 0
+    outside.update({"plate_name": "untouched"}, synchronize_session=False)
+    db.session.commit()
+
+    section.update(row_start="C", row_end="C", compound_name="compound_2")
+    section.pop('id')
+    assert client.post(f"plates/{plate_id}/sections", json=section) == 201
+    res = client.get("items/?{}".format(urlencode({'row': 'C', 'plate_id': plate_id})))
+    in_section = [i for i in res.json if section["col_start"] <= i['col'] <= section["col_end"]]
+    assert in_section
+    assert all(i['compound_name'] == 'compound_2' for i in in_section)
+
+    id = client.get(f'plates/{plate_id}/sections').json[0]['id']
+    assert client.patch(f"sections/{id}", json={"compound_name": "compound_1"}) == 200
+    assert {m.plate_name for m in outside} == {"untouched"}
+    app.config["ITEM_META_TABLE"] = False
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+import io
+
+import numpy as np
+import pytest
+
+from app.reader.base import BaseReader
+
+
+class CountingReader(BaseReader):
+    size = (4, 4)
+
+    def __init__(self):
+        self.calls = []
+        self.batches = []
+        self.versions = {}
+
+    def etag(self, uri):
+        return self.versions.get(uri, "v1")
+
+    def read_many(self, uris, ordered=True, return_exceptions=False):
+        self.batches.append(list(uris))
+        return super().read_many(self.batches[-1], ordered, return_exceptions)
+
+    def __call__(self, uri):
+        self.calls.append(uri)
+        return np.full(self.size, len(self.calls), dtype=np.float64)
+
+
+@pytest.fixture()
+def cache_app(app, tmp_path):
+    app.config["THUMBNAIL_CACHE_DIR"] = str(tmp_path)
+    app.config["THUMBNAIL_CACHE_DISK_BYTES"] = 10 * 2**20
+    return app
+
+
+def make_cache(app, reader):
+    from app.thumbnails import ThumbnailCache
+
+    return ThumbnailCache(app, reader)
+
+
+def test_repeated_views_read_once(cache_app):
+    reader = CountingReader()
+    cache = make_cache(cache_app, reader)
+
+    first = cache("scheme://a.tiff")
+    assert np.array_equal(cache("scheme://a.tiff"), first)
+    assert reader.calls == ["scheme://a.tiff"]
+
+    # disk tier is shared with other processes
+    other = make_cache(cache_app, reader)
+    assert np.array_equal(other("scheme://a.tiff"), first)
+    assert reader.calls == ["scheme://a.tiff"]
+
+
+def test_etag_change_reads_again(cache_app):
+    cache_app.config["THUMBNAIL_KEY_TTL"] = 0
+    reader = CountingReader()
+    cache = make_cache(cache_app, reader)
+
+    cache("scheme://a.tiff")
+    reader.versions["scheme://a.tiff"] = "v2"
+    cache("scheme://a.tiff")
+
+    assert len(reader.calls) == 2
+
+
+def test_lru_eviction(cache_app):
+    from app.thumbnails import DiskLRU, MemoryLRU
+
+    image = np.zeros((4, 4))
+    memory = MemoryLRU(max_bytes=2 * image.nbytes)
+    for key in "abc":
+        memory.put(key, image)
+    assert memory.get("a") is None
+    assert memory.get("c") is not None
+
+    disk = DiskLRU(cache_app.config["THUMBNAIL_CACHE_DIR"], max_bytes=1)
+    disk.put("a", image)
+    assert disk.get("a") is None
+    assert disk.n_bytes == 0
+
+
+def test_warm(cache_app):
+    reader = CountingReader()
+    cache = make_cache(cache_app, reader)
+
+    assert cache.warm(["scheme://a.tiff", "scheme://b.tiff"]) == 2
+    assert cache.warm(["scheme://a.tiff", "scheme://c.tiff"]) == 1
+    cache("scheme://b.tiff")
+    assert len(reader.calls) == 3
+    assert reader.batches == [["scheme://a.tiff", "scheme://b.tiff"], ["scheme://c.tiff"]]
+
+
+def test_to_uint8():
+    from app.views.remote_item import to_uint8
+
+    image = to_uint8(np.array([[100, 150], [200, 300]], dtype=np.uint16))
+    assert image.dtype == np.uint8
+    assert image.min() == 0 and image.max() == 255
+    assert not to_uint8(np.ones((2, 2))).any()
+
+
+@pytest.mark.parametrize("format", ["png", "webp"])
+def test_item_image(app, format):
+    from flask.testing import FlaskClient
+    from PIL import Image
+    from app import models as mdl
+    from app.views.remote_item import ItemImageView
+
+    reader = CountingReader()
+    cache = make_cache(app, reader)
+    app.add_url_rule("/item/<uuid:id>/image.<any(png, webp):format>",
+                     view_func=ItemImageView.as_view("item_image", cache))
+    item = mdl.Item.query.first()
+    url = f"/item/{item.id}/image.{format}"
+
+    with FlaskClient(app) as client:
+        res = client.get(url)
+        assert res.status_code == 200
+        assert res.mimetype == f"image/{format}"
+        assert res.cache_control.max_age > 0
+        assert Image.open(io.BytesIO(res.data)).size == reader.size
+
+        res = client.get(url, headers={"If-None-Match": res.headers["ETag"]})
+        assert res.status_code == 304
+    assert len(reader.calls) == 1
+
+
+def test_well_positions():
+    from app.views.plate import well_positions
+
+    shape, positions = well_positions([("A", 1), ("B", 12), ("H", 3)])
+    assert shape == (8, 12)
+    assert positions == [(0, 0), (1, 11), (7, 2)]
+
+    shape, _ = well_positions([("A", 0), ("P", 13)])
+    assert shape == (16, 24)
+
+
+def test_plate_montage(app):
+    from flask.testing import FlaskClient
+    from PIL import Image
+    from app import models as mdl
+    from app.views.plate import PlateMontageView
+
+    app.config["THUMBNAIL_KEY_TTL"] = 0
+    reader = CountingReader()
+    cache = make_cache(app, reader)
+    app.add_url_rule("/plate/<uuid:id>/montage.<any(png, webp):format>",
+                     view_func=PlateMontageView.as_view("plate_montage", cache))
+    item = mdl.Item.query.first()
+    n_wells = (
+        mdl.Item.query.filter_by(timepoint_id=item.timepoint_id, chan=1, site=0)
+        .with_entities(mdl.Item.row, mdl.Item.col).distinct().count()
+    )
+    url = (f"/plate/{item.plate_id}/montage.png"
+           f"?timepoint_id={item.timepoint_id}&chan=1&site=0&size=8")
+
+    with FlaskClient(app) as client:
+        res = client.get(url)
+        assert res.status_code == 200
+        assert Image.open(io.BytesIO(res.data)).size == (12 * 8, 8 * 8)
+        assert len(reader.calls) == n_wells
+        # wells are read in one batch
+        assert [len(batch) for batch in reader.batches] == [n_wells]
+
+        # finished montage is cached
+        assert client.get(url).status_code == 200
+        assert len(reader.calls) == n_wells
+
+        # an overwritten file gives a new montage
+        reader.versions[reader.calls[0]] = "v2"
+        assert client.get(url).status_code == 200
+        assert len(reader.calls) == n_wells + 1
+
+        for size in [0, -5, 10**5]:
+            assert client.get(url.replace("size=8", f"size={size}")).status_code == 400
+
+
+def test_plate_montage_reuses_keys_and_skips_failed_wells(app):
+    from flask.testing import FlaskClient
+    from app import models as mdl
+    from app.views.plate import PlateMontageView
+
+    class FlakyReader(CountingReader):
+        n_lookups = 0
+
+        def etag(self, uri):
+            self.n_lookups += 1
+            return super().etag(uri)
+
+        def __call__(self, uri):
+            # the first read fails
+            if not self.calls:
+                self.calls.append(uri)
+                raise RuntimeError("connection reset")
+            return super().__call__(uri)
+
+    reader = FlakyReader()
+    cache = make_cache(app, reader)
+    app.add_url_rule("/plate/<uuid:id>/montage.<any(png, webp):format>",
+                     view_func=PlateMontageView.as_view("plate_montage", cache))
+    item = mdl.Item.query.first()
+    url = (f"/plate/{item.plate_id}/montage.png"
+           f"?timepoint_id={item.timepoint_id}&chan=1&site=0&size=8")
+
+    with FlaskClient(app) as client:
+        assert client.get(url).status_code == 200
+        n_lookups = reader.n_lookups
+        assert n_lookups > 0
+
+        # montage computed again, with the keys looked up by the first request
+        cache.memory.clear()
+        assert client.get(url).status_code == 200
+        assert reader.n_lookups == n_lookups
+
+
+def test_neighbour_uris(app):
+    from app import models as mdl
+    from app.views.remote_item import neighbour_uris
+
+    item = mdl.Item.query.filter_by(chan=1, site=0).first()
+    neighbours = mdl.Item.query.filter(mdl.Item.uri.in_(neighbour_uris(item))).all()
+
+    assert neighbours
+    assert item.uri not in {n.uri for n in neighbours}
+    for n in neighbours:
+        assert (n.plate_id, n.timepoint_id, n.row, n.col) == (
+            item.plate_id, item.timepoint_id, item.row, item.col)
+        assert n.site == 0 or (n.site == 1 and n.chan == 1)
+
+
+def test_neighbour_uris_without_sites(app):
+    from app import db, models as mdl
+    from app.views.remote_item import neighbour_uris
+
+    item = mdl.Item.query.filter_by(chan=1, site=0).first()
+    mdl.Item.query.filter_by(
+        plate_id=item.plate_id, timepoint_id=item.timepoint_id, row=item.row, col=item.col
+    ).update({"site": None})
+    db.session.commit()
+
+    neighbours = mdl.Item.query.filter(mdl.Item.uri.in_(neighbour_uris(item))).all()
+
+    assert neighbours
+    assert all(n.site is None for n in neighbours)
+
+
+def test_prefetch_is_bounded(app):
+    import threading
+
+    release = threading.Event()
+
+    class SlowReader(CountingReader):
+        def __call__(self, uri):
+            release.wait(5)
+            return super().__call__(uri)
+
+    app.config["THUMBNAIL_PREFETCH_MAX_PENDING"] = 2
+    reader = SlowReader()
+    cache = make_cache(app, reader)
+
+    assert cache.prefetch(["scheme://a", "scheme://b", "scheme://c"]) == 2
+    assert cache.prefetch(["scheme://a", "scheme://d"]) == 0
+    release.set()
+    cache._prefetch_pool.shutdown(wait=True)
+
+    assert sorted(reader.calls) == ["scheme://a", "scheme://b"]
+    cache("scheme://a")
+    assert len(reader.calls) == 2
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import numpy as np
+import pytest
+
+
+class FullResReader:
+    def __init__(self, shape=(1000, 600)):
+        self.image = np.arange(np.prod(shape), dtype=np.uint16).reshape(shape)
+        self.reads = 0
+
+    def etag(self, uri):
+        return "v1"
+
+    def read(self, uri):
+        self.reads += 1
+        return self.image
+
+
+@pytest.fixture()
+def tiles(app, tmp_path):
+    from app.tiles import TileCache
+
+    app.config["TILE_CACHE_DIR"] = str(tmp_path)
+    app.config["TILE_SIZE"] = 256
+    reader = FullResReader()
+    return TileCache(app, reader), reader
+
+
+def test_downsample():
+    from app.tiles import downsample
+
+    image = np.arange(15, dtype=np.float32).reshape(3, 5)
+    small = downsample(image)
+    assert small.shape == (2, 3)
+    assert small[0, 0] == image[:2, :2].mean()
+
+
+def test_pyramid(tiles):
+    tiles, reader = tiles
+
+    info = tiles.info("scheme://a.tiff")
+    assert info["max_zoom"] == 2
+    assert (info["width"], info["height"]) == (600, 1000)
+
+    # full resolution level
+    tile = tiles.tile("scheme://a.tiff", 2, 1, 3)
+    assert np.array_equal(tile, reader.image[768:1000, 256:512])
+    # single tile level
+    assert tiles.tile("scheme://a.tiff", 0, 0, 0).shape == (250, 150)
+    assert tiles.tile("scheme://a.tiff", 2, 3, 0) is None
+    assert tiles.tile("scheme://a.tiff", 3, 0, 0) is None
+    assert reader.reads == 1
+
+
+def test_tiles_view(app, tiles):
+    from flask.testing import FlaskClient
+    from app import models as mdl
+    from app.views.remote_item import ItemTilesView
+
+    tiles, reader = tiles
+    view = ItemTilesView.as_view("item_tiles", tiles)
+    app.add_url_rule("/item/<uuid:id>/tiles", view_func=view)
+    app.add_url_rule("/item/<uuid:id>/tiles/<int:z>/<int:x>/<int:y>", view_func=view)
+    item = mdl.Item.query.first()
+
+    with FlaskClient(app) as client:
+        assert client.get(f"/item/{item.id}/tiles").json["max_zoom"] == 2
+        res = client.get(f"/item/{item.id}/tiles/1/1/1")
+        assert res.status_code == 200
+        assert res.mimetype.startswith("image/")
+        assert client.get(f"/item/{item.id}/tiles/1/5/0").status_code == 404
+
+
+def test_pyramids_are_evicted_with_their_info(app, tmp_path):
+    import os
+    from app.tiles import TileCache
+
+    app.config["TILE_CACHE_DIR"] = str(tmp_path)
+    # room for a single pyramid of 1000x600 uint16 (and its float32 levels)
+    app.config["TILE_CACHE_DISK_BYTES"] = 2 * 2**20
+    reader = FullResReader()
+    tiles = TileCache(app, reader)
+
+    for i in range(3):
+        tiles.info(f"scheme://{i}.tiff")
+    assert tiles.disk.n_bytes <= 2 * 2**20
+    assert len(os.listdir(tmp_path)) < 3 * 4
+
+    # first pyramid was evicted, info included: it is built again
+    tiles.tile("scheme://0.tiff", 0, 0, 0)
+    assert reader.reads == 4
+    assert len(tiles._locks) == TileCache.n_locks
+
+
+def test_tile_cache_requires_directory(app):
+    from app.tiles import TileCache
+
+    app.config["TILE_CACHE_DIR"] = None
+    with pytest.raises(ValueError):
+        TileCache(app, FullResReader())
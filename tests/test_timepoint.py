@@ -1,3 +1,4 @@
+import uuid
 import pytest
 from urllib.parse import urlencode
 
@@ -24,6 +25,11 @@ def test_create_good_inputs(client):
 
     data = {'uri': "scheme://project/exp3/tp1/"}
     res = client.post(f"plates/{plate_id}/timepoints", json=data)
+    assert res == 202
+    job = client.get(f"jobs/{res.json['id']}").json
+    assert job['status'] == 'done'
+    assert job['n_items'] == 216
+    assert job['timepoint_id'] is not None
     params = urlencode({'plate_id': plate_id})
     res = client.get("items/?{}".format(params))
     assert res  == 200
@@ -36,3 +42,155 @@ def test_delete_should_clear_items(client):
     items = client.get('items/').json
     items = [item for item in items if item['timepoint_id'] == id]
     assert len(items) == 0
+
+
+def test_insert_items_by_batches(app):
+    from app import db
+    from app import models as mdl
+    from app.extensions import parser
+    from app.ingest import insert_items
+
+    plate = mdl.Plate(name="bulk plate")
+    db.session.add(plate)
+    db.session.flush()
+    timepoint = mdl.TimePoint(uri="scheme://project/exp3/tp2/", plate_id=plate.id)
+    db.session.add(timepoint)
+    db.session.flush()
+
+    progress = []
+    n_items = insert_items(parser.iter(timepoint.uri), plate.id, timepoint.id,
+                           batch_size=50, progress=progress.append)
+    db.session.commit()
+
+    assert n_items == len(parser(timepoint.uri)) == 216
+    assert progress == list(range(50, 216, 50)) + [216]
+    items = mdl.Item.query.filter_by(timepoint_id=timepoint.id).all()
+    assert len(items) == n_items
+    assert {i.col for i in items} == set(range(12))
+
+
+def test_ingest_in_background(tmp_path, monkeypatch):
+    import time
+    from flask import Flask
+    from app import models as mdl
+    from app.api.v1.timepoint import create_timepoint
+    from app.extensions import db, parser
+    from app.jobs import JobRunner
+    from app.reader.test import TestReader
+
+    app = Flask(__name__)
+    app.config.from_object("app.config.test")
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path}/db.sqlite"
+    app.config["INGEST_WORKERS"] = 1
+    db.init_app(app)
+    parser.init_app(app, TestReader())
+    runner = JobRunner(db)
+    runner.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        plate = mdl.Plate(name="plate")
+        db.session.add(plate)
+        db.session.commit()
+
+        monkeypatch.setattr("app.api.v1.timepoint.jobs", runner)
+        job = create_timepoint({"uri": "scheme://project/exp2/tp1/", "plate_id": plate.id})
+        runner.executor.shutdown(wait=True)
+
+        db.session.expire_all()
+        job = db.session.get(mdl.Job, job.id)
+        assert job.status == mdl.JobStatus.done
+        assert job.n_items == 216
+        assert mdl.Item.query.filter_by(timepoint_id=job.timepoint_id).count() == 216
+
+
+def test_ingest_does_not_lock_job_before_progress(app):
+    from sqlalchemy import event
+    from app import db
+    from app import models as mdl
+    from app.api.v1.timepoint import ingest_timepoint
+
+    plate = mdl.Plate(name="progress plate")
+    db.session.add(plate)
+    db.session.commit()
+    job = mdl.Job(uri="scheme://project/exp3/tp1/", plate_id=plate.id)
+    db.session.add(job)
+    db.session.commit()
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    progress = []
+    def check_progress(n_items):
+        # progress updates the job row from another transaction
+        assert not [s for s in statements if s.startswith("UPDATE job")]
+        progress.append(n_items)
+
+    app.config["INGEST_BATCH_SIZE"] = 50
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        ingest_timepoint(job, check_progress, {"uri": job.uri, "plate_id": plate.id})
+        db.session.flush()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    db.session.commit()
+
+    assert progress == list(range(50, 216, 50)) + [216]
+    assert job.n_items == 216
+    assert job.timepoint_id is not None
+
+
+def test_sync(client):
+    from app import db
+    from app import models as mdl
+    from app.extensions import parser
+    from app.reader.test import make_uris
+
+    plate_id = client.post("plates/", json={"name": "sync plate"}).json['id']
+    res = client.post(f"plates/{plate_id}/timepoints",
+                      json={'uri': "scheme://project/exp3/tp1/"})
+    timepoint_id = client.get(f"jobs/{res.json['id']}").json['timepoint_id']
+    timepoint = db.session.get(mdl.TimePoint, uuid.UUID(timepoint_id))
+    assert timepoint.last_key == "scheme://project/exp3/tp1/file_C11_w3_s1_exp.tiff"
+
+    # new files are listed after the last key, some files are removed
+    reader = parser.reader
+    reader.items += list(make_uris(exps=["exp3"], tps=["tp1"], rows="D"))
+    reader.items = [i for i in reader.items if "tp1/file_A" not in i]
+
+    res = client.post(f"timepoints/{timepoint_id}/sync")
+    assert res == 202
+    assert res.json['status'] == 'done'
+    assert res.json['n_items'] == 72
+
+    items = mdl.Item.query.filter_by(timepoint_id=timepoint.id)
+    assert items.count() == 216 + 72
+    assert items.filter_by(missing=True).count() == 0
+
+    res = client.post(f"timepoints/{timepoint_id}/sync?full=true")
+    assert res == 202
+    assert res.json['n_items'] == 0
+    assert items.filter_by(missing=True).count() == 72
+    assert {i.row for i in items.filter_by(missing=True)} == {"A"}
+
+
+def test_thumbnails_are_computed_after_commit(client, app, monkeypatch):
+    from app import db
+    from app import models as mdl
+
+    calls = []
+    def warm(uris):
+        job = mdl.Job.query.filter_by(uri="scheme://project/exp3/tp1/").one()
+        # job transaction is committed
+        calls.append((job.finished is not None, not db.session.dirty, len(list(uris))))
+        return 0
+
+    monkeypatch.setattr("app.api.v1.timepoint.thumbnails.warm", warm)
+    app.config["THUMBNAILS_ON_INGEST"] = True
+    plate_id = client.post("plates/", json={"name": "thumbnail plate"}).json['id']
+    res = client.post(f"plates/{plate_id}/timepoints",
+                      json={'uri': "scheme://project/exp3/tp1/"})
+
+    assert res.json['status'] == 'done'
+    assert calls == [(True, True, 216)]